@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (C) 2013-2016 Julian Metzler
+# See the LICENSE file for the full license.
+
+"""
+Script to display a clock in big numerals with a bar graph of the seconds
+on a character LCD
+"""
+
+import argparse
+import datetime
+import pylcd
+import time
+
+PINMAP = {
+	'RS': 2,
+	'RW': 3,
+	'E': 4,
+	'D4': 22,
+	'D5': 10,
+	'D6': 9,
+	'D7': 11,
+	'LED': 18,
+}
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument('-l', '--lines', type = int, choices = [2, 3, 4], default = 4)
+	parser.add_argument('-c', '--columns', type = int, default = 20)
+	parser.add_argument('-r', '--rows', type = int, choices = [2, 3], default = 3, help = "Height of the numerals in lines")
+	parser.add_argument('-i', '--interval', type = float, default = 0.1, help = "Refresh interval in seconds")
+	args = parser.parse_args()
+	display = pylcd.hd44780.Display(backend = pylcd.GPIOBackend, pinmap = PINMAP, lines = args.lines, columns = args.columns, debug = False)
+	display.clear()
+	rows = min(args.rows, args.lines)
+
+	while True:
+		now = datetime.datetime.now()
+		# Only the cells of digits that changed are sent to the display
+		display.big_number(now.strftime("%H:%M"), rows = rows)
+		if args.lines > rows:
+			display.bar_graph((now.second + now.microsecond / 1000000.0) / 60.0, line = args.lines - 1)
+		time.sleep(args.interval)
+
+if __name__ == "__main__":
+	main()
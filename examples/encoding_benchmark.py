@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (C) 2013-2016 Julian Metzler
+# See the LICENSE file for the full license.
+
+"""
+Script to measure the per-byte cost of the bit encoding helpers and of a
+full HD44780 write through the dummy backend
+"""
+
+import argparse
+import pylcd
+import timeit
+
+from pylcd.utils import *
+
+def string_value_to_byte(value):
+	# The string based conversion the lookup tables replaced, for comparison
+	b = bin(value)[2:10]
+	b = "0" * (8 - len(b)) + b
+	return tuple([bit == "1" for bit in list(b)])
+
+def string_byte_to_value(byte):
+	return int("".join([str(int(item)) for item in byte]), 2)
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument('-n', '--number', type = int, default = 20000, help = "Number of bytes per measurement")
+	args = parser.parse_args()
+
+	values = [i % 256 for i in range(args.number)]
+	bytes = [value_to_byte(value) for value in values]
+	display = pylcd.hd44780.Display(backend = pylcd.DummyBackend, pinmap = {}, skip_init = True, enable_backlight = False)
+
+	cases = [
+		("bin() string to bits", lambda: [string_value_to_byte(value) for value in values]),
+		("value_to_byte", lambda: [value_to_byte(value) for value in values]),
+		("BYTE_BITS index", lambda: [BYTE_BITS[value] for value in values]),
+		("value_to_nibbles", lambda: [value_to_nibbles(value) for value in values]),
+		("bits to int() string", lambda: [string_byte_to_value(byte) for byte in bytes]),
+		("byte_to_value", lambda: [byte_to_value(byte) for byte in bytes]),
+		("bool_list_to_mask", lambda: [bool_list_to_mask(byte) for byte in bytes]),
+		("hd44780 write_value", lambda: [display.write_value(value, data = False) for value in values]),
+	]
+
+	for name, func in cases:
+		duration = min(timeit.repeat(func, number = 1, repeat = 5))
+		print "%-22s %8.0f ns per byte" % (name, duration / args.number * 1e9)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (C) 2013-2016 Julian Metzler
+# See the LICENSE file for the full license.
+
+"""
+Script to benchmark the stages of the QR encoder. Its output is checked against
+an independent encoder in tests/test_pyqrnative.py.
+"""
+
+import argparse
+import time
+
+from pylcd import PyQRNative as qr
+
+ERROR_CORRECT_LEVELS = [('L', qr.QRErrorCorrectLevel.L), ('M', qr.QRErrorCorrectLevel.M), ('Q', qr.QRErrorCorrectLevel.Q), ('H', qr.QRErrorCorrectLevel.H)]
+
+# Payload kinds, each repeated to fill the symbol, and the segment class used to encode them
+CORPUS = [
+	('numeric', "0123456789", qr.QRNumber),
+	('alphanumeric', "HTTPS://EXAMPLE.COM/DEVICE/0042 ", qr.QRAlphaNum),
+	('wifi', "WIFI:T:WPA;S:pylcd-net;P:correct horse 42;;", qr.QR8bitByte),
+	('binary', "".join([chr((i * 37 + 11) % 256) for i in range(256)]), qr.QR8bitByte),
+]
+
+STAGES = ['data', 'rs', 'mask', 'matrix']
+
+def fill_payload(text, segment_class, version, level):
+	# The longest repetition of the text that still fits as a single segment of the given mode
+	capacity = sum([block.dataCount for block in qr.QRRSBlock.getRSBlocks(version, level)]) * 8
+	segment = segment_class("")
+	capacity -= 4 + qr.QRUtil.getLengthInBits(segment.mode, version)
+	length = capacity * 6 // {qr.QRNumber: 20, qr.QRAlphaNum: 33, qr.QR8bitByte: 48}[segment_class] + 1
+	while segment_class("x" * length).getBitLength() > capacity:
+		length -= 1
+	return (text * (length // len(text) + 1))[:length]
+
+def encode(payload, segment_class, version, level, timings):
+	code = qr.QRCode(version, level)
+	code.addData(payload, segment_class("").mode)
+
+	start = time.time()
+	buffer = qr.QRCode.createBuffer(version, level, code.dataList)
+	timings['data'] += time.time() - start
+
+	start = time.time()
+	code.dataCache = qr.QRCode.createBytes(buffer, qr.QRRSBlock.getRSBlocks(version, level))
+	timings['rs'] += time.time() - start
+
+	start = time.time()
+	mask = code.getBestMaskPattern()
+	timings['mask'] += time.time() - start
+
+	start = time.time()
+	code.makeImpl(False, mask)
+	timings['matrix'] += time.time() - start
+
+	return code, mask
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument('-v', '--versions', type = str, default = "1-40", help = "Range of type numbers to encode, e.g. '1-10'")
+	args = parser.parse_args()
+
+	first, last = [int(part) for part in args.versions.split("-")] if "-" in args.versions else [int(args.versions)] * 2
+	versions = range(first, last + 1)
+
+	count = 0
+	print "%-8s %10s %10s %10s %10s %8s" % ("version", "data ms", "rs ms", "mask ms", "matrix ms", "codes")
+	totals = dict([(stage, 0.0) for stage in STAGES])
+	for version in versions:
+		timings = dict([(stage, 0.0) for stage in STAGES])
+		for kind, text, segment_class in CORPUS:
+			for level_name, level in ERROR_CORRECT_LEVELS:
+				payload = fill_payload(text, segment_class, version, level)
+				encode(payload, segment_class, version, level, timings)
+				count += 1
+		for stage in STAGES:
+			totals[stage] += timings[stage]
+		print "%-8i %10.2f %10.2f %10.2f %10.2f %8i" % (version, timings['data'] * 1000, timings['rs'] * 1000, timings['mask'] * 1000, timings['matrix'] * 1000, len(CORPUS) * len(ERROR_CORRECT_LEVELS))
+	print "%-8s %10.2f %10.2f %10.2f %10.2f %8i" % ("total", totals['data'] * 1000, totals['rs'] * 1000, totals['mask'] * 1000, totals['matrix'] * 1000, count)
+
+if __name__ == "__main__":
+	main()
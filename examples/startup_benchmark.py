@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (C) 2013-2016 Julian Metzler
+# See the LICENSE file for the full license.
+
+"""
+Script to measure how long importing pylcd takes and to check that
+optional dependencies are only loaded on first use
+"""
+
+import argparse
+import subprocess
+import sys
+
+# Modules that must not be imported by a plain "import pylcd"
+LAZY_MODULES = ['PIL', 'PIL.Image', 'pylcd.PyQRNative']
+
+CHILD_SCRIPT = """
+import sys, time
+start = time.time()
+import pylcd
+duration = time.time() - start
+print repr((duration, [name for name in %r if name in sys.modules]))
+""" % LAZY_MODULES
+
+def measure():
+	output = subprocess.check_output([sys.executable, '-c', CHILD_SCRIPT])
+	return eval(output.strip().splitlines()[-1])
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument('-r', '--runs', type = int, default = 10)
+	parser.add_argument('-l', '--limit', type = float, default = None, help = "Fail if the median import time in milliseconds exceeds this value")
+	args = parser.parse_args()
+
+	durations = []
+	loaded = set()
+	for i in range(args.runs):
+		duration, modules = measure()
+		durations.append(duration * 1000.0)
+		loaded.update(modules)
+	durations.sort()
+	median = durations[len(durations) // 2]
+
+	print "import pylcd: median %.1f ms, min %.1f ms, max %.1f ms over %i runs" % (median, durations[0], durations[-1], args.runs)
+
+	failed = False
+	if loaded:
+		print "FAIL: imported eagerly: %s" % ", ".join(sorted(loaded))
+		failed = True
+	if args.limit is not None and median > args.limit:
+		print "FAIL: median import time exceeds %.1f ms" % args.limit
+		failed = True
+	sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+	main()
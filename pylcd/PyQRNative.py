@@ -1,5 +1,5 @@
+import binascii
 import math
-from PIL import Image, ImageDraw
 
 #QRCode for Python
 #
@@ -20,60 +20,143 @@ from PIL import Image, ImageDraw
 #   http://www.denso-wave.com/qrcode/faqpatent-e.html
 
 
+class QRNumber:
+
+    def __init__(self, data):
+        self.mode = QRMode.MODE_NUMBER
+        self.data = data
+
+    def getLength(self):
+        return len(self.data)
+
+    def getBitLength(self):
+        return len(self.data) // 3 * 10 + (0, 4, 7)[len(self.data) % 3]
+
+    def write(self, buffer):
+        #// three digits in 10 bits, the remaining one or two in 4 or 7 bits
+        for i in range(0, len(self.data) - 2, 3):
+            buffer.put(int(self.data[i:i + 3]), 10)
+        rest = len(self.data) % 3
+        if rest:
+            buffer.put(int(self.data[-rest:]), (0, 4, 7)[rest])
+    def __repr__(self):
+        return self.data
+
+class QRAlphaNum:
+
+    def __init__(self, data):
+        self.mode = QRMode.MODE_ALPHA_NUM
+        self.data = data
+
+    def getLength(self):
+        return len(self.data)
+
+    def getBitLength(self):
+        return len(self.data) // 2 * 11 + len(self.data) % 2 * 6
+
+    def write(self, buffer):
+        #// two characters in 11 bits, a trailing one in 6 bits
+        for i in range(0, len(self.data) - 1, 2):
+            buffer.put(QRUtil.ALPHA_NUM_CHARS.index(self.data[i]) * 45 + QRUtil.ALPHA_NUM_CHARS.index(self.data[i + 1]), 11)
+        if len(self.data) % 2:
+            buffer.put(QRUtil.ALPHA_NUM_CHARS.index(self.data[-1]), 6)
+    def __repr__(self):
+        return self.data
+
 class QR8bitByte:
 
     def __init__(self, data):
         self.mode = QRMode.MODE_8BIT_BYTE
+        #// unicode text is sent as UTF-8, like ks0108 does
+        if isinstance(data, unicode):
+            data = data.encode('utf-8')
         self.data = data
 
     def getLength(self):
         return len(self.data)
 
+    def getBitLength(self):
+        return len(self.data) * 8
+
     def write(self, buffer):
-        for i in range(len(self.data)):
-            #// not JIS ...
-            buffer.put(ord(self.data[i]), 8)
+        #// not JIS ...
+        buffer.putBytes(self.data)
+    def __repr__(self):
+        return self.data
+
+class QRAutoData:
+
+    #// first type number of each range with the same length field sizes
+    TYPE_RANGES = (1, 10, 27)
+
+    def __init__(self, data):
+        self.data = data
+        self.segments = {}
+
+    def getSegments(self, typeNumber):
+        #// the optimal segmentation only changes with the length field sizes
+        key = max(start for start in QRAutoData.TYPE_RANGES if start <= typeNumber)
+        if key not in self.segments:
+            self.segments[key] = QRUtil.getOptimalSegments(self.data, key)
+        return self.segments[key]
     def __repr__(self):
         return self.data
 
 class QRCode:
+    #// per type number: (function pattern rows, reserved module rows, data module coordinates)
+    TEMPLATES = {}
+
     def __init__(self, typeNumber, errorCorrectLevel):
         self.typeNumber = typeNumber
         self.errorCorrectLevel = errorCorrectLevel
-        self.modules = None
+        self.moduleRows = None
+        self.reservedRows = None
         self.moduleCount = 0
         self.dataCache = None
         self.dataList = []
-    def addData(self, data):
-        newData = QR8bitByte(data)
+    def addData(self, data, mode = None):
+        if (mode is None):
+            newData = QRAutoData(data)
+        elif (mode == QRMode.MODE_NUMBER):
+            newData = QRNumber(data)
+        elif (mode == QRMode.MODE_ALPHA_NUM):
+            newData = QRAlphaNum(data)
+        elif (mode == QRMode.MODE_8BIT_BYTE):
+            newData = QR8bitByte(data)
+        else:
+            raise Exception("mode:%s" % mode)
         self.dataList.append(newData)
         self.dataCache = None
     def isDark(self, row, col):
         if (row < 0 or self.moduleCount <= row or col < 0 or self.moduleCount <= col):
             raise Exception("%s,%s - %s" % (row, col, self.moduleCount))
-        return self.modules[row][col]
+        return (self.moduleRows[row] >> col) & 1 == 1
+    def isReserved(self, row, col):
+        return (self.reservedRows[row] >> col) & 1 == 1
+    def setModule(self, row, col, dark):
+        bit = 1 << col
+        self.reservedRows[row] |= bit
+        if dark:
+            self.moduleRows[row] |= bit
+        else:
+            self.moduleRows[row] &= ~bit
     def getModuleCount(self):
         return self.moduleCount
+    def getModuleRows(self):
+        #// one integer per row, bit n is the module in column n
+        return self.moduleRows
     def make(self):
+        if (self.typeNumber < 1):
+            self.typeNumber = QRUtil.getMinimumTypeNumber(self.dataList, self.errorCorrectLevel)
         self.makeImpl(False, self.getBestMaskPattern() )
     def makeImpl(self, test, maskPattern):
 
+        functionRows, reservedRows, dataCoords = QRCode.getTemplate(self.typeNumber)
         self.moduleCount = self.typeNumber * 4 + 17
-        self.modules = [None for x in range(self.moduleCount)]
+        self.moduleRows = functionRows[:]
+        self.reservedRows = reservedRows[:]
 
-        for row in range(self.moduleCount):
-
-            self.modules[row] = [None for x in range(self.moduleCount)]
-
-            for col in range(self.moduleCount):
-                self.modules[row][col] = None #//(col + row) % 3;
-
-        self.setupPositionProbePattern(0, 0)
-        self.setupPositionProbePattern(self.moduleCount - 7, 0)
-        self.setupPositionProbePattern(0, self.moduleCount - 7)
-        self.setupPositionAdjustPattern()
-        self.setupTimingPattern()
-        self.setupTypeInfo(test, maskPattern)
+        self.setupTypeInfo(test, maskPattern or 0)
 
         if (self.typeNumber >= 7):
             self.setupTypeNumber(test)
@@ -82,6 +165,62 @@ class QRCode:
             self.dataCache = QRCode.createData(self.typeNumber, self.errorCorrectLevel, self.dataList)
         self.mapData(self.dataCache, maskPattern)
 
+    @staticmethod
+    def getTemplate(typeNumber):
+
+        if typeNumber not in QRCode.TEMPLATES:
+
+            code = QRCode(typeNumber, 0)
+            code.moduleCount = typeNumber * 4 + 17
+            code.moduleRows = [0 for x in range(code.moduleCount)]
+            code.reservedRows = [0 for x in range(code.moduleCount)]
+
+            code.setupPositionProbePattern(0, 0)
+            code.setupPositionProbePattern(code.moduleCount - 7, 0)
+            code.setupPositionProbePattern(0, code.moduleCount - 7)
+            code.setupPositionAdjustPattern()
+            code.setupTimingPattern()
+            code.setupTypeInfo(True, 0)
+
+            if (typeNumber >= 7):
+                code.setupTypeNumber(True)
+
+            QRCode.TEMPLATES[typeNumber] = (code.moduleRows, code.reservedRows, code.getDataCoordinates())
+
+        return QRCode.TEMPLATES[typeNumber]
+
+    def getDataCoordinates(self):
+
+        #// the zig-zag order in which the data bits are placed
+        coords = []
+        inc = -1
+        row = self.moduleCount - 1
+
+        #// the column is modified inside the loop, so range() can't be used
+        col = self.moduleCount - 1
+
+        while (col > 0):
+
+            if (col == 6): col-=1
+
+            while (True):
+
+                for c in range(2):
+
+                    if (not self.isReserved(row, col - c)):
+                        coords.append((row, col - c))
+
+                row += inc
+
+                if (row < 0 or self.moduleCount <= row):
+                    row -= inc
+                    inc = -inc
+                    break
+
+            col -= 2
+
+        return coords
+
     def setupPositionProbePattern(self, row, col):
 
         for r in range(-1, 8):
@@ -95,20 +234,26 @@ class QRCode:
                 if ( (0 <= r and r <= 6 and (c == 0 or c == 6) )
                         or (0 <= c and c <= 6 and (r == 0 or r == 6) )
                         or (2 <= r and r <= 4 and 2 <= c and c <= 4) ):
-                    self.modules[row + r][col + c] = True;
+                    self.setModule(row + r, col + c, True)
                 else:
-                    self.modules[row + r][col + c] = False;
+                    self.setModule(row + r, col + c, False)
 
     def getBestMaskPattern(self):
 
+        #// build the unmasked test matrix once, the candidates only differ in the masked data modules
+        self.makeImpl(True, None)
+        fullRow = (1 << self.moduleCount) - 1
+        planes = QRUtil.getMaskPlanes(self.moduleCount)
+        rows = self.moduleRows
+        dataRows = [fullRow ^ reserved for reserved in self.reservedRows]
+
         minLostPoint = 0
         pattern = 0
 
         for i in range(8):
 
-            self.makeImpl(True, i);
-
-            lostPoint = QRUtil.getLostPoint(self);
+            plane = planes[i]
+            lostPoint = QRUtil.getLostPointRows([rows[r] ^ (plane[r] & dataRows[r]) for r in range(self.moduleCount)], self.moduleCount)
 
             if (i == 0 or minLostPoint > lostPoint):
                 minLostPoint = lostPoint
@@ -119,6 +264,8 @@ class QRCode:
     def createMovieClip(self):
         raise Exception("Method not relevant to Python port")
     def makeImage(self):
+        from PIL import Image, ImageDraw
+
         boxsize = 10 #pixels per box
         offset = 4 #boxes as border
         pixelsize = (self.getModuleCount() + offset + offset) * boxsize
@@ -139,14 +286,14 @@ class QRCode:
     def setupTimingPattern(self):
 
         for r in range(8, self.moduleCount - 8):
-            if (self.modules[r][6] != None):
+            if (self.isReserved(r, 6)):
                 continue
-            self.modules[r][6] = (r % 2 == 0)
+            self.setModule(r, 6, r % 2 == 0)
 
         for c in range(8, self.moduleCount - 8):
-            if (self.modules[6][c] != None):
+            if (self.isReserved(6, c)):
                 continue
-            self.modules[6][c] = (c % 2 == 0)
+            self.setModule(6, c, c % 2 == 0)
 
     def setupPositionAdjustPattern(self):
 
@@ -159,7 +306,7 @@ class QRCode:
                 row = pos[i]
                 col = pos[j]
 
-                if (self.modules[row][col] != None):
+                if (self.isReserved(row, col)):
                     continue
 
                 for r in range(-2, 3):
@@ -167,9 +314,9 @@ class QRCode:
                     for c in range(-2, 3):
 
                         if (r == -2 or r == 2 or c == -2 or c == 2 or (r == 0 and c == 0) ):
-                            self.modules[row + r][col + c] = True
+                            self.setModule(row + r, col + c, True)
                         else:
-                            self.modules[row + r][col + c] = False
+                            self.setModule(row + r, col + c, False)
 
     def setupTypeNumber(self, test):
 
@@ -177,11 +324,11 @@ class QRCode:
 
         for i in range(18):
             mod = (not test and ( (bits >> i) & 1) == 1)
-            self.modules[i // 3][i % 3 + self.moduleCount - 8 - 3] = mod;
+            self.setModule(i // 3, i % 3 + self.moduleCount - 8 - 3, mod)
 
         for i in range(18):
             mod = (not test and ( (bits >> i) & 1) == 1)
-            self.modules[i % 3 + self.moduleCount - 8 - 3][i // 3] = mod;
+            self.setModule(i % 3 + self.moduleCount - 8 - 3, i // 3, mod)
 
     def setupTypeInfo(self, test, maskPattern):
 
@@ -194,11 +341,11 @@ class QRCode:
             mod = (not test and ( (bits >> i) & 1) == 1)
 
             if (i < 6):
-                self.modules[i][8] = mod
+                self.setModule(i, 8, mod)
             elif (i < 8):
-                self.modules[i + 1][8] = mod
+                self.setModule(i + 1, 8, mod)
             else:
-                self.modules[self.moduleCount - 15 + i][8] = mod
+                self.setModule(self.moduleCount - 15 + i, 8, mod)
 
         #// horizontal
         for i in range(15):
@@ -206,67 +353,53 @@ class QRCode:
             mod = (not test and ( (bits >> i) & 1) == 1);
 
             if (i < 8):
-                self.modules[8][self.moduleCount - i - 1] = mod
+                self.setModule(8, self.moduleCount - i - 1, mod)
             elif (i < 9):
-                self.modules[8][15 - i - 1 + 1] = mod
+                self.setModule(8, 15 - i - 1 + 1, mod)
             else:
-                self.modules[8][15 - i - 1] = mod
+                self.setModule(8, 15 - i - 1, mod)
 
         #// fixed module
-        self.modules[self.moduleCount - 8][8] = (not test)
+        self.setModule(self.moduleCount - 8, 8, not test)
 
     def mapData(self, data, maskPattern):
 
-        inc = -1
-        row = self.moduleCount - 1
-        bitIndex = 7
-        byteIndex = 0
-
-        for col in range(self.moduleCount - 1, 0, -2):
-
-            if (col == 6): col-=1
-
-            while (True):
-
-                for c in range(2):
-
-                    if (self.modules[row][col - c] == None):
-
-                        dark = False
-
-                        if (byteIndex < len(data)):
-                            dark = ( ( (data[byteIndex] >> bitIndex) & 1) == 1)
-
-                        mask = QRUtil.getMask(maskPattern, row, col - c)
-
-                        if (mask):
-                            dark = not dark
-
-                        self.modules[row][col - c] = dark
-                        bitIndex-=1
-
-                        if (bitIndex == -1):
-                            byteIndex+=1
-                            bitIndex = 7
-
-                row += inc
-
-                if (row < 0 or self.moduleCount <= row):
-                    row -= inc
-                    inc = -inc
-                    break
+        #// data modules are still light here, so only the dark bits need to be set
+        coords = QRCode.getTemplate(self.typeNumber)[2]
+        rows = self.moduleRows
+        bitIndex = 0
+
+        for byte in data[:(len(coords) + 7) // 8]:
+            if byte:
+                for row, col in coords[bitIndex:bitIndex + 8]:
+                    if (byte & 0x80):
+                        rows[row] |= 1 << col
+                    byte = (byte << 1) & 0xFF
+            bitIndex += 8
+
+        if (maskPattern is not None):
+            fullRow = (1 << self.moduleCount) - 1
+            plane = QRUtil.getMaskPlanes(self.moduleCount)[maskPattern]
+            for r in range(self.moduleCount):
+                rows[r] ^= plane[r] & (fullRow ^ self.reservedRows[r])
     PAD0 = 0xEC
     PAD1 = 0x11
 
     @staticmethod
     def createData(typeNumber, errorCorrectLevel, dataList):
 
+        rsBlocks = QRRSBlock.getRSBlocks(typeNumber, errorCorrectLevel)
+        buffer = QRCode.createBuffer(typeNumber, errorCorrectLevel, dataList)
+        return QRCode.createBytes(buffer, rsBlocks)
+
+    @staticmethod
+    def createBuffer(typeNumber, errorCorrectLevel, dataList):
+
         rsBlocks = QRRSBlock.getRSBlocks(typeNumber, errorCorrectLevel)
 
         buffer = QRBitBuffer();
 
-        for i in range(len(dataList)):
-            data = dataList[i]
+        for data in QRUtil.getSegmentList(dataList, typeNumber):
             buffer.put(data.mode, 4)
             buffer.put(data.getLength(), QRUtil.getLengthInBits(data.mode, typeNumber) )
             data.write(buffer)
@@ -277,32 +410,20 @@ class QRCode:
             totalDataCount += rsBlocks[i].dataCount
 
         if (buffer.getLengthInBits() > totalDataCount * 8):
-            raise Exception("code length overflow. ("
-                + buffer.getLengthInBits()
-                + ">"
-                +  totalDataCount * 8
-                + ")")
+            raise Exception("code length overflow. (%d>%d)" % (buffer.getLengthInBits(), totalDataCount * 8))
 
         #// end code
         if (buffer.getLengthInBits() + 4 <= totalDataCount * 8):
             buffer.put(0, 4)
 
         #// padding
-        while (buffer.getLengthInBits() % 8 != 0):
-            buffer.putBit(False)
+        buffer.put(0, -buffer.getLengthInBits() % 8)
 
         #// padding
-        while (True):
-
-            if (buffer.getLengthInBits() >= totalDataCount * 8):
-                break
-            buffer.put(QRCode.PAD0, 8)
+        padCount = totalDataCount - buffer.getLengthInBits() // 8
+        buffer.putBytes(bytearray([QRCode.PAD0, QRCode.PAD1]) * (padCount // 2) + bytearray([QRCode.PAD0]) * (padCount % 2))
 
-            if (buffer.getLengthInBits() >= totalDataCount * 8):
-                break
-            buffer.put(QRCode.PAD1, 8)
-
-        return QRCode.createBytes(buffer, rsBlocks)
+        return buffer
 
     @staticmethod
     def createBytes(buffer, rsBlocks):
@@ -315,6 +436,9 @@ class QRCode:
         dcdata = [0 for x in range(len(rsBlocks))]
         ecdata = [0 for x in range(len(rsBlocks))]
 
+        #// the data codewords of each block are views into the bit buffer, not copies
+        view = memoryview(buffer.buffer)
+
         for r in range(len(rsBlocks)):
 
             dcCount = rsBlocks[r].dataCount
@@ -323,29 +447,18 @@ class QRCode:
             maxDcCount = max(maxDcCount, dcCount)
             maxEcCount = max(maxEcCount, ecCount)
 
-            dcdata[r] = [0 for x in range(dcCount)]
-
-            for i in range(len(dcdata[r])):
-                dcdata[r][i] = 0xff & buffer.buffer[i + offset]
+            dcdata[r] = view[offset:offset + dcCount]
             offset += dcCount
 
-            rsPoly = QRUtil.getErrorCorrectPolynomial(ecCount)
-            rawPoly = QRPolynomial(dcdata[r], rsPoly.getLength() - 1)
-
-            modPoly = rawPoly.mod(rsPoly)
-            ecdata[r] = [0 for x in range(rsPoly.getLength()-1)]
-            for i in range(len(ecdata[r])):
-                modIndex = i + modPoly.getLength() - len(ecdata[r])
-                if (modIndex >= 0):
-                    ecdata[r][i] = modPoly.get(modIndex)
-                else:
-                    ecdata[r][i] = 0
+            ecdata[r] = QRUtil.getErrorCorrectBytes(dcdata[r], ecCount)
 
         totalCodeCount = 0
         for i in range(len(rsBlocks)):
             totalCodeCount += rsBlocks[i].totalCount
 
-        data = [None for x in range(totalCodeCount)]
+        #// a bytearray takes both the integers of ecdata and the one character strings
+        #// a memoryview yields on Python 2
+        data = bytearray(totalCodeCount)
         index = 0
 
         for i in range(maxDcCount):
@@ -385,7 +498,11 @@ class QRMaskPattern:
     PATTERN110 = 6
     PATTERN111 = 7
 
+MEMORYVIEW_YIELDS_INTS = isinstance(memoryview(bytearray(1))[0], int)
+
 class QRUtil(object):
+    DIGIT_CHARS = "0123456789"
+    ALPHA_NUM_CHARS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:"
     PATTERN_POSITION_TABLE = [
         [],
         [6, 18],
@@ -429,6 +546,10 @@ class QRUtil(object):
         [6, 30, 58, 86, 114, 142, 170]
     ]
 
+    MASK_PLANES = {}
+    ERROR_CORRECT_POLYNOMIALS = {}
+    ERROR_CORRECT_TABLES = {}
+
     G15 = (1 << 10) | (1 << 8) | (1 << 5) | (1 << 4) | (1 << 2) | (1 << 1) | (1 << 0)
     G18 = (1 << 12) | (1 << 11) | (1 << 10) | (1 << 9) | (1 << 8) | (1 << 5) | (1 << 2) | (1 << 0)
     G15_MASK = (1 << 14) | (1 << 12) | (1 << 10) | (1 << 4) | (1 << 1)
@@ -468,11 +589,160 @@ class QRUtil(object):
         if maskPattern == QRMaskPattern.PATTERN111 : return ( (i * j) % 3 + (i + j) % 2) % 2 == 0
         raise Exception("bad maskPattern:" + maskPattern);
     @staticmethod
+    def getMaskPlanes(moduleCount):
+        #// one list of row bitsets per mask pattern, bit n of a row is column n
+        if moduleCount not in QRUtil.MASK_PLANES:
+            QRUtil.MASK_PLANES[moduleCount] = [
+                [QRUtil.getRowBits([QRUtil.getMask(maskPattern, row, col) for col in range(moduleCount)]) for row in range(moduleCount)]
+                for maskPattern in range(8)]
+        return QRUtil.MASK_PLANES[moduleCount]
+    @staticmethod
+    def getRowBits(row):
+        bits = 0
+        for col in range(len(row)):
+            if row[col]:
+                bits |= 1 << col
+        return bits
+    @staticmethod
+    def getBitCount(bits):
+        return bin(bits).count("1")
+    @staticmethod
     def getErrorCorrectPolynomial(errorCorrectLength):
-        a = QRPolynomial([1], 0);
-        for i in range(errorCorrectLength):
-            a = a.multiply(QRPolynomial([1, QRMath.gexp(i)], 0) )
-        return a
+        if errorCorrectLength not in QRUtil.ERROR_CORRECT_POLYNOMIALS:
+            a = QRPolynomial([1], 0);
+            for i in range(errorCorrectLength):
+                a = a.multiply(QRPolynomial([1, QRMath.gexp(i)], 0) )
+            QRUtil.ERROR_CORRECT_POLYNOMIALS[errorCorrectLength] = a
+        return QRUtil.ERROR_CORRECT_POLYNOMIALS[errorCorrectLength]
+    @staticmethod
+    def getErrorCorrectTable(errorCorrectLength):
+        #// entry n is the generator polynomial (without its leading 1) multiplied by n,
+        #// packed into one integer with the highest coefficient in the highest byte
+        if errorCorrectLength not in QRUtil.ERROR_CORRECT_TABLES:
+            rsPoly = QRUtil.getErrorCorrectPolynomial(errorCorrectLength)
+            logs = [LOG_TABLE[rsPoly.get(i)] for i in range(1, rsPoly.getLength())]
+            table = [0]
+            for n in range(1, 256):
+                row = 0
+                for log in logs:
+                    row = (row << 8) | EXP_TABLE[(LOG_TABLE[n] + log) % 255]
+                table.append(row)
+            QRUtil.ERROR_CORRECT_TABLES[errorCorrectLength] = table
+        return QRUtil.ERROR_CORRECT_TABLES[errorCorrectLength]
+    @staticmethod
+    def getErrorCorrectBytes(data, errorCorrectLength):
+        #// remainder of the data polynomial divided by the generator polynomial,
+        #// computed by a shift register that holds all remainder bytes in one integer
+        table = QRUtil.getErrorCorrectTable(errorCorrectLength)
+        shift = 8 * (errorCorrectLength - 1)
+        mask = (1 << (8 * errorCorrectLength)) - 1
+        remainder = 0
+        for n in QRUtil.getByteValues(data):
+            remainder = ((remainder << 8) & mask) ^ table[(remainder >> shift) ^ n]
+        return [(remainder >> (8 * i)) & 0xFF for i in range(errorCorrectLength - 1, -1, -1)]
+    @staticmethod
+    def getByteValues(data):
+        #// iterates the byte values of a list, bytearray or memoryview without copying,
+        #// memoryviews yield one character strings on Python 2
+        if isinstance(data, memoryview) and not MEMORYVIEW_YIELDS_INTS:
+            return (ord(c) for c in data)
+        return data
+    @staticmethod
+    def getSegmentList(dataList, typeNumber):
+
+        segments = []
+        for data in dataList:
+            if isinstance(data, QRAutoData):
+                segments.extend(data.getSegments(typeNumber))
+            else:
+                segments.append(data)
+        return segments
+    @staticmethod
+    def getOptimalSegments(data, typeNumber):
+
+        #// dynamic programming over the characters, costs are in 1/6 bits so that
+        #// numeric (10/3 bits) and alphanumeric (11/2 bits) characters stay integral
+        modes = (QRMode.MODE_NUMBER, QRMode.MODE_ALPHA_NUM, QRMode.MODE_8BIT_BYTE)
+        charCosts = (20, 33, 48)
+        headCosts = [(4 + QRUtil.getLengthInBits(mode, typeNumber)) * 6 for mode in modes]
+
+        if (len(data) == 0):
+            return []
+
+        prevCosts = headCosts[:]
+        charModes = []
+
+        for c in data:
+
+            curCosts = [None, None, None]
+            curModes = [None, None, None]
+
+            for j in range(3):
+                if (j == 0 and c not in QRUtil.DIGIT_CHARS) or (j == 1 and c not in QRUtil.ALPHA_NUM_CHARS):
+                    continue
+                if (j == 2 and isinstance(c, unicode)):
+                    curCosts[j] = prevCosts[j] + charCosts[j] * len(c.encode('utf-8'))
+                else:
+                    curCosts[j] = prevCosts[j] + charCosts[j]
+                curModes[j] = j
+
+            #// switch to another mode after this character
+            for j in range(3):
+                for k in range(3):
+                    if (curCosts[k] is None):
+                        continue
+                    newCost = (curCosts[k] + 5) // 6 * 6 + headCosts[j]
+                    if (curCosts[j] is None or newCost < curCosts[j]):
+                        curCosts[j] = newCost
+                        curModes[j] = k
+
+            charModes.append(curModes)
+            prevCosts = curCosts
+
+        #// walk back from the cheapest final state
+        mode = min(range(3), key = lambda j: prevCosts[j])
+        dataModes = [0] * len(data)
+        for i in range(len(data) - 1, -1, -1):
+            mode = charModes[i][mode]
+            dataModes[i] = mode
+
+        segmentClasses = (QRNumber, QRAlphaNum, QR8bitByte)
+        segments = []
+        start = 0
+        for i in range(1, len(data) + 1):
+            if (i < len(data) and dataModes[i] == dataModes[start]):
+                continue
+            #// a segment can't hold more characters than its length field counts
+            maxLength = (1 << QRUtil.getLengthInBits(modes[dataModes[start]], typeNumber)) - 1
+            segmentData = data[start:i]
+            if (dataModes[start] == 2 and isinstance(segmentData, unicode)):
+                segmentData = segmentData.encode('utf-8')
+            for j in range(0, len(segmentData), maxLength):
+                segments.append(segmentClasses[dataModes[start]](segmentData[j:j + maxLength]))
+            start = i
+
+        return segments
+    @staticmethod
+    def getMinimumTypeNumber(dataList, errorCorrectLevel):
+
+        for typeNumber in range(1, 41):
+
+            totalDataCount = 0
+            for rsBlock in QRRSBlock.getRSBlocks(typeNumber, errorCorrectLevel):
+                totalDataCount += rsBlock.dataCount
+
+            length = 0
+            for data in QRUtil.getSegmentList(dataList, typeNumber):
+                lengthBits = QRUtil.getLengthInBits(data.mode, typeNumber)
+                if (data.getLength() >= (1 << lengthBits)):
+                    length = None
+                    break
+                length += 4 + lengthBits + data.getBitLength()
+
+            if (length is not None and length <= totalDataCount * 8):
+                return typeNumber
+
+        raise Exception("data too long for any type number")
     @staticmethod
     def getLengthInBits(mode, type):
 
@@ -510,83 +780,104 @@ class QRUtil(object):
             raise Exception("type:" + type)
     @staticmethod
     def getLostPoint(qrCode):
+        return QRUtil.getLostPointRows(qrCode.getModuleRows(), qrCode.getModuleCount())
+    @staticmethod
+    def getRunPoints(runs, starts):
 
-        moduleCount = qrCode.getModuleCount();
+        #// runs has a bit for every module that starts 5 modules of the same colour, a run of
+        #// 5 + i modules has i + 1 of them and scores 3 + i
+        return QRUtil.getBitCount(runs) + 2 * QRUtil.getBitCount(starts)
+    @staticmethod
+    def getCountedPatterns(patterns, counted):
+
+        #// patterns has a bit for every 1:1:3:1:1 pattern start, counted for those that also have the
+        #// light area. Like the reference, the search continues behind a counted pattern, which
+        #// skips the patterns sharing its modules that start 4 or 6 modules later
+        if (not patterns & ((patterns << 4) | (patterns << 6))):
+            return counted
+        result = 0
+        while (patterns):
+            start = patterns & -patterns
+            if (start & counted and not result & ((start >> 4) | (start >> 6))):
+                result |= start
+            patterns ^= start
+        return result
+    @staticmethod
+    def getLostPointRows(rows, moduleCount):
 
-        lostPoint = 0;
+        #// penalty score of ISO/IEC 18004:2015 7.8.3.1, evaluated without the format and version information
+        #// rows are bitsets, bit n is the module in column n
+        fullRow = (1 << moduleCount) - 1
+        lostPoint = 0
 
         #// LEVEL1
+        #// runs of 5 + i modules of the same colour, along the rows
 
-        for row in range(moduleCount):
-
-            for col in range(moduleCount):
-
-                sameCount = 0;
-                dark = qrCode.isDark(row, col);
-
-                for r in range(-1, 2):
-
-                    if (row + r < 0 or moduleCount <= row + r):
-                        continue
-
-                    for c in range(-1, 2):
+        for r in rows:
+            same = ~(r ^ (r >> 1)) & (fullRow >> 1)
+            runs = same & (same >> 1) & (same >> 2) & (same >> 3)
+            lostPoint += QRUtil.getRunPoints(runs, runs & ~(runs << 1))
 
-                        if (col + c < 0 or moduleCount <= col + c):
-                            continue
-                        if (r == 0 and c == 0):
-                            continue
+        #// and along the columns, bit n of each row for column n
 
-                        if (dark == qrCode.isDark(row + r, col + c) ):
-                            sameCount+=1
-                if (sameCount > 5):
-                    lostPoint += (3 + sameCount - 5)
+        same = [~(rows[row] ^ rows[row + 1]) & fullRow for row in range(moduleCount - 1)]
+        previous = 0
+        for row in range(moduleCount - 4):
+            runs = same[row] & same[row + 1] & same[row + 2] & same[row + 3]
+            lostPoint += QRUtil.getRunPoints(runs, runs & ~previous)
+            previous = runs
 
         #// LEVEL2
 
+        blockRow = fullRow >> 1
+
         for row in range(moduleCount - 1):
-            for col in range(moduleCount - 1):
-                count = 0;
-                if (qrCode.isDark(row,     col    ) ): count+=1
-                if (qrCode.isDark(row + 1, col    ) ): count+=1
-                if (qrCode.isDark(row,     col + 1) ): count+=1
-                if (qrCode.isDark(row + 1, col + 1) ): count+=1
-                if (count == 0 or count == 4):
-                    lostPoint += 3
+            a = rows[row]
+            b = rows[row + 1]
+            dark = a & (a >> 1) & b & (b >> 1)
+            light = ~(a | (a >> 1) | b | (b >> 1))
+            lostPoint += 3 * QRUtil.getBitCount((dark | light) & blockRow)
 
         #// LEVEL3
-
-        for row in range(moduleCount):
-            for col in range(moduleCount - 6):
-                if (qrCode.isDark(row, col)
-                        and not qrCode.isDark(row, col + 1)
-                        and  qrCode.isDark(row, col + 2)
-                        and  qrCode.isDark(row, col + 3)
-                        and  qrCode.isDark(row, col + 4)
-                        and not qrCode.isDark(row, col + 5)
-                        and  qrCode.isDark(row, col + 6) ):
-                    lostPoint += 40
-
-        for col in range(moduleCount):
-            for row in range(moduleCount - 6):
-                if (qrCode.isDark(row, col)
-                        and not qrCode.isDark(row + 1, col)
-                        and  qrCode.isDark(row + 2, col)
-                        and  qrCode.isDark(row + 3, col)
-                        and  qrCode.isDark(row + 4, col)
-                        and not qrCode.isDark(row + 5, col)
-                        and  qrCode.isDark(row + 6, col) ):
-                    lostPoint += 40
+        #// 1:1:3:1:1 patterns with 4 light modules on either side, the edge counts as light
+
+        edges = 1 | (1 << (moduleCount - 7))
+        patternRow = fullRow >> 6
+
+        for r in rows:
+            patterns = r & ~(r >> 1) & (r >> 2) & (r >> 3) & (r >> 4) & ~(r >> 5) & (r >> 6) & patternRow
+            if (patterns):
+                light = ~((r << 1) | (r << 2) | (r << 3) | (r << 4)) | ~((r >> 7) | (r >> 8) | (r >> 9) | (r >> 10)) | edges
+                lostPoint += 40 * QRUtil.getBitCount(QRUtil.getCountedPatterns(patterns, patterns & light))
+
+        counted = [0] * (moduleCount - 6)
+        for row in range(moduleCount - 6):
+            patterns = rows[row] & ~rows[row + 1] & rows[row + 2] & rows[row + 3] & rows[row + 4] & ~rows[row + 5] & rows[row + 6] & fullRow
+            if (row >= 4):
+                patterns &= ~counted[row - 4]
+            if (row >= 6):
+                patterns &= ~counted[row - 6]
+            if (patterns):
+                if (row == 0 or row == moduleCount - 7):
+                    counted[row] = patterns
+                else:
+                    above = 0
+                    for r in rows[max(row - 4, 0):row]:
+                        above |= r
+                    below = 0
+                    for r in rows[row + 7:row + 11]:
+                        below |= r
+                    counted[row] = patterns & ~(above & below)
+                lostPoint += 40 * QRUtil.getBitCount(counted[row])
 
         #// LEVEL4
 
-        darkCount = 0;
+        darkCount = 0
 
-        for col in range(moduleCount):
-            for row in range(moduleCount):
-                if (qrCode.isDark(row, col) ):
-                    darkCount+=1
+        for row in range(moduleCount):
+            darkCount += QRUtil.getBitCount(rows[row])
 
-        ratio = abs(100 * darkCount / moduleCount / moduleCount - 50) / 5
+        ratio = int(abs(100 * (float(darkCount) / (moduleCount * moduleCount)) - 50) / 5)
         lostPoint += ratio * 10
 
         return lostPoint
@@ -596,15 +887,11 @@ class QRMath:
     @staticmethod
     def glog(n):
         if (n < 1):
-            raise Exception("glog(" + n + ")")
+            raise Exception("glog(%s)" % n)
         return LOG_TABLE[n];
     @staticmethod
     def gexp(n):
-        while n < 0:
-            n += 255
-        while n >= 256:
-            n -= 255
-        return EXP_TABLE[n];
+        return EXP_TABLE[n % 255];
 
 EXP_TABLE = [x for x in range(256)]
 
@@ -653,18 +940,21 @@ class QRPolynomial:
         if (self.getLength() - e.getLength() < 0):
             return self;
 
-        ratio = QRMath.glog(self.get(0) ) - QRMath.glog(e.get(0) )
+        num = self.num[:]
+        eLogs = [LOG_TABLE[n] for n in e.num]
+        offset = 0
 
-        num = [0 for x in range(self.getLength())]
+        while (len(num) - offset >= len(eLogs)):
 
-        for i in range(self.getLength()):
-            num[i] = self.get(i);
+            ratio = LOG_TABLE[num[offset]] - eLogs[0]
 
-        for i in range(e.getLength()):
-            num[i] ^= QRMath.gexp(QRMath.glog(e.get(i) ) + ratio)
+            for i in range(len(eLogs)):
+                num[offset + i] ^= EXP_TABLE[(eLogs[i] + ratio) % 255]
 
-        # recursive call
-        return QRPolynomial(num, 0).mod(e);
+            while (offset < len(num) and num[offset] == 0):
+                offset += 1
+
+        return QRPolynomial(num, 0);
 
 class QRRSBlock:
 
@@ -763,7 +1053,7 @@ class QRRSBlock:
       [5, 109, 87, 1, 110, 88],
       [5, 65, 41, 5, 66, 42],
       [5, 54, 24, 7, 55, 25],
-      [11, 36, 12],
+      [11, 36, 12, 7, 37, 13],
 
       # 16
       [5, 122, 98, 1, 123, 99],
@@ -957,24 +1247,37 @@ class QRRSBlock:
 
 class QRBitBuffer:
     def __init__(self):
-        self.buffer = []
+        self.buffer = bytearray()
         self.length = 0
     def __repr__(self):
         return ".".join([str(n) for n in self.buffer])
     def get(self, index):
-        bufIndex = math.floor(index / 8)
-        val = ( (self.buffer[bufIndex] >> (7 - index % 8) ) & 1) == 1
-        print "get ", val
-        return ( (self.buffer[bufIndex] >> (7 - index % 8) ) & 1) == 1
+        return ( (self.buffer[index // 8] >> (7 - index % 8) ) & 1) == 1
     def put(self, num, length):
-        for i in range(length):
-            self.putBit( ( (num >> (length - i - 1) ) & 1) == 1)
+        if (length <= 0):
+            return
+
+        #// merge the bits of a partially filled last byte into num and append whole bytes
+        used = self.length % 8
+        if (used):
+            num = ( (self.buffer.pop() >> (8 - used) ) << length) | (num & ( (1 << length) - 1) )
+            length += used
+            self.length -= used
+        else:
+            num &= (1 << length) - 1
+
+        padding = -length % 8
+        self.buffer.extend(binascii.unhexlify("%0*x" % ( (length + padding) // 4, num << padding) ) )
+        self.length += length
+    def putBytes(self, data):
+        if (len(data) == 0):
+            return
+        if (self.length % 8 == 0):
+            self.buffer.extend(data)
+            self.length += len(data) * 8
+        else:
+            self.put(int(binascii.hexlify(data), 16), len(data) * 8)
     def getLengthInBits(self):
         return self.length
     def putBit(self, bit):
-        bufIndex = self.length // 8
-        if len(self.buffer) <= bufIndex:
-            self.buffer.append(0)
-        if bit:
-            self.buffer[bufIndex] |= (0x80 >> (self.length % 8) )
-        self.length+=1
\ No newline at end of file
+        self.put(1 if bit else 0, 1)
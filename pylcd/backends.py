@@ -17,6 +17,7 @@ class K8055Backend:
 			except:
 				raise IOError("Could not establish a connection to the K8055 board.")
 		
+		self.nibble_masks = None
 		self.reverse_pinmap = dict([(value, key) for key, value in pinmap.iteritems()])
 		for pin, output in pinmap.iteritems():
 			setattr(self, 'PIN_%s' % pin, output)
@@ -38,12 +39,20 @@ class K8055Backend:
 		self.board.ClearAllAnalog()
 	
 	def write_nibble(self, nibble, data = True):
-		mask = nibble_to_mask(nibble, data = data)
+		mask = nibble_to_mask(self, nibble, data = data)
 		self.board.WriteAllDigital(mask)
 	
+	def write_nibble_value(self, value, data = True):
+		if self.nibble_masks is None:
+			self.nibble_masks = [[nibble_to_mask(self, BYTE_NIBBLES[nibble][1], data = _data) for nibble in range(16)] for _data in (False, True)]
+		self.board.WriteAllDigital(self.nibble_masks[bool(data)][value])
+	
 	def write_byte(self, byte, data = True):
 		return self.write_nibble(byte, data = data)
 	
+	def write_byte_value(self, value, data = True):
+		return self.write_byte(BYTE_BITS[value], data = data)
+	
 	def set_brightness(self, level):
 		assert level >= 0
 		assert level <= 1023
@@ -95,11 +104,30 @@ class GPIOBackend:
 		self.gpio.digitalWrite(self.PIN_D6, nibble[1])
 		self.gpio.digitalWrite(self.PIN_D7, nibble[0])
 	
+	def write_nibble_value(self, value, data = True):
+		self.gpio.digitalWrite(self.PIN_RS, data)
+		self.gpio.digitalWrite(self.PIN_D4, value & 1)
+		self.gpio.digitalWrite(self.PIN_D5, (value >> 1) & 1)
+		self.gpio.digitalWrite(self.PIN_D6, (value >> 2) & 1)
+		self.gpio.digitalWrite(self.PIN_D7, (value >> 3) & 1)
+	
 	def write_byte(self, byte, data = True):
 		self.gpio.digitalWrite(self.PIN_RS, data)
 		for i in range(8):
 			self.gpio.digitalWrite(getattr(self, "PIN_D%i" % i), byte[i])
 	
+	def write_byte_value(self, value, data = True):
+		# Same bit order as write_byte, the most significant bit goes to D0
+		self.gpio.digitalWrite(self.PIN_RS, data)
+		self.gpio.digitalWrite(self.PIN_D0, (value >> 7) & 1)
+		self.gpio.digitalWrite(self.PIN_D1, (value >> 6) & 1)
+		self.gpio.digitalWrite(self.PIN_D2, (value >> 5) & 1)
+		self.gpio.digitalWrite(self.PIN_D3, (value >> 4) & 1)
+		self.gpio.digitalWrite(self.PIN_D4, (value >> 3) & 1)
+		self.gpio.digitalWrite(self.PIN_D5, (value >> 2) & 1)
+		self.gpio.digitalWrite(self.PIN_D6, (value >> 1) & 1)
+		self.gpio.digitalWrite(self.PIN_D7, value & 1)
+	
 	def set_brightness(self, level):
 		assert level >= 0
 		assert level <= 1023
@@ -141,8 +169,14 @@ class ArduinoBackend:
 	def write_nibble(self, nibble, data = True):
 		self.serial.write("".join(chr(b) for b in [self.PIN_RS, int(data), self.PIN_D4, int(nibble[3]), self.PIN_D5, int(nibble[2]), self.PIN_D6, int(nibble[1]), self.PIN_D7, int(nibble[0])]))
 	
+	def write_nibble_value(self, value, data = True):
+		self.serial.write("".join(chr(b) for b in [self.PIN_RS, int(data), self.PIN_D4, value & 1, self.PIN_D5, (value >> 1) & 1, self.PIN_D6, (value >> 2) & 1, self.PIN_D7, (value >> 3) & 1]))
+	
 	def write_byte(self, byte, data = True):
-		raise NotImplementedError
+		self.serial.write("".join(chr(b) for b in [self.PIN_RS, int(data)] + sum([[getattr(self, "PIN_D%i" % i), int(byte[i])] for i in range(8)], [])))
+	
+	def write_byte_value(self, value, data = True):
+		self.write_byte(BYTE_BITS[value], data = data)
 	
 	def set_brightness(self, level):
 		assert level >= 0
@@ -212,8 +246,17 @@ class DebugBackend:
 		self.output_states[self.PIN_D7][1] = nibble[0]
 		self._update()
 	
+	def write_nibble_value(self, value, data = True):
+		self.write_nibble(BYTE_NIBBLES[value][1], data = data)
+	
 	def write_byte(self, byte, data = True):
-		raise NotImplementedError
+		self.output_states[self.PIN_RS][1] = data
+		for i in range(8):
+			self.output_states[getattr(self, "PIN_D%i" % i)][1] = byte[i]
+		self._update()
+	
+	def write_byte_value(self, value, data = True):
+		self.write_byte(BYTE_BITS[value], data = data)
 	
 	def set_brightness(self, level):
 		assert level >= 0
@@ -250,8 +293,14 @@ class DummyBackend:
 	def write_nibble(self, nibble, data = True):
 		pass
 	
+	def write_nibble_value(self, value, data = True):
+		pass
+	
 	def write_byte(self, byte, data = True):
 		pass
 	
+	def write_byte_value(self, value, data = True):
+		pass
+	
 	def set_brightness(self, level):
 		pass
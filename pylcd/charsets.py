@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2013 Julian Metzler
+# See the LICENSE file for the full license.
+
+"""
+Translation of Unicode text to the character ROMs of HD44780 compatible LCDs
+"""
+
+import re
+import unicodedata
+
+from .utils import *
+
+# <n> selects CGRAM slot n, <name> a registered glyph
+CGRAM_SLOT_PATTERN = re.compile(r"<([0-7])>")
+GLYPH_NAME_PATTERN = re.compile(r"<([A-Za-z_]\w*)>")
+
+# Substitutions for characters a ROM doesn't have, tried before stripping accents
+FALLBACKS = {
+	u"‘": u"'",
+	u"’": u"'",
+	u"‚": u"'",
+	u"“": u"\"",
+	u"”": u"\"",
+	u"„": u"\"",
+	u"«": u"\"",
+	u"»": u"\"",
+	u"‐": u"-",
+	u"–": u"-",
+	u"—": u"-",
+	u"−": u"-",
+	u"…": u"...",
+	u"×": u"x",
+	u"\xa0": u" ",
+}
+
+def rom_table(start, chars):
+	# Maps each character to its position in the ROM counted from start, NUL marks glyphs without a Unicode equivalent
+	return [(char, start + i) for i, char in enumerate(chars) if char != u"\0"]
+
+class Charset:
+	def __init__(self, name, characters, missing = u"", fallbacks = {}, cache_size = 256):
+		self.name = name
+		# ASCII characters are sent unchanged unless listed in missing
+		self.characters = dict([(ord(char), unichr(value)) for char, value in characters])
+		self.missing = missing
+		self.fallbacks = fallbacks
+		self.table = dict(self.characters)
+		for char in missing:
+			self.table[ord(char)] = self.substitute(char)
+		self.cache = LRUCache(cache_size)
+	
+	def is_available(self, char):
+		return ord(char) in self.characters or (ord(char) < 0x80 and char not in self.missing)
+	
+	def substitute(self, char):
+		stripped = u"".join([c for c in unicodedata.normalize('NFKD', char) if not unicodedata.combining(c)])
+		for candidate in (self.fallbacks.get(char), FALLBACKS.get(char), stripped):
+			if candidate and candidate != char and all([self.is_available(c) for c in candidate]):
+				return u"".join([self.characters.get(ord(c), c) for c in candidate])
+		return u"?"
+	
+	def encode(self, text):
+		# Byte strings are assumed to be in the ROM encoding already
+		if type(text) is not unicode:
+			return text
+		for char in set(text):
+			if ord(char) > 0x7F and ord(char) not in self.table:
+				self.table[ord(char)] = self.substitute(char)
+		return text.translate(self.table).encode('latin-1')
+	
+	def compile(self, string):
+		# Splits a string into ROM encoded byte strings with <n> expanded, alternating with glyph names
+		key = (type(string), string)
+		parts = self.cache.get(key)
+		if parts is None:
+			parts = GLYPH_NAME_PATTERN.split(string)
+			for i in range(len(parts)):
+				if i % 2:
+					parts[i] = str(parts[i])
+				else:
+					parts[i] = CGRAM_SLOT_PATTERN.sub(lambda match: chr(int(match.group(1))), self.encode(parts[i]))
+			parts = tuple(parts)
+			self.cache.put(key, parts)
+		return parts
+
+# ROM code A00, ASCII with katakana and some Greek and mathematical symbols
+ROM_A00 = Charset('A00',
+	rom_table(0x5C, u"¥") +
+	rom_table(0x7E, u"→←") +
+	rom_table(0xA1, u"".join([unichr(0xFF61 + i) for i in range(63)])) +
+	rom_table(0xE0, u"αäβεμσρ\0√\0\0\0¢£ñö\0\0θ∞ΩüΣπ\0\0千万円÷\0█") +
+	[(u"°", 0xDF), (u"·", 0xA5), (u"µ", 0xE4), (u"Ω", 0xF4)],
+	missing = u"\\~",
+	fallbacks = {u"Ä": u"ä", u"Ö": u"ö", u"Ü": u"ü", u"ß": u"β", u"~": u"-"})
+
+# ROM code A02, ASCII with Latin-1, Cyrillic and Greek characters and some symbols
+ROM_A02 = Charset('A02',
+	rom_table(0x10, u"▶◀“”⏫⏬●↵↑↓→←≤≥▲▼") +
+	rom_table(0x7F, u"⌂") +
+	rom_table(0x80, u"БДЖЗИЙЛПУЦЧШЩЪЫЭα♪ΓπΣσ♬τ\0ΘΩδ∞♥ε∩") +
+	rom_table(0xA0, u"".join([unichr(i) for i in range(0xA0, 0x100)])))
+
+CHARSETS = {
+	'A00': ROM_A00,
+	'A02': ROM_A02,
+}
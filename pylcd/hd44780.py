@@ -6,29 +6,365 @@
 Library for HD44780 compatible character LCDs
 """
 
-import re
+import itertools
+import os
+import threading
 import time
 import warnings
 
+from collections import OrderedDict, deque
 from .backends import *
+from .charsets import *
 from .inputs import *
 from .utils import *
 
+class Controller:
+	# Shadow of the DDRAM contents and the address counter of one HD44780, None where unknown
+	def __init__(self, enable_pin):
+		self.enable_pin = enable_pin
+		self.ddram = [None] * 0x80
+		self.address = None
+		self.cgram = False
+		self.increment = True
+		self.multiline = True
+		# DDRAM offset of the first visible column, changed by display shifts
+		self.shift = 0
+	
+	def track_data(self, value):
+		if self.address is not None and not self.cgram:
+			self.ddram[self.address] = value
+			self.address = self.next_address(self.address)
+	
+	def track_command(self, value):
+		if value & 0x80:
+			self.address = value & 0x7F
+			self.cgram = False
+		elif value & 0x40:
+			# CGRAM access, the address counter no longer points into DDRAM
+			self.address = None
+			self.cgram = True
+		elif value & 0x20:
+			self.multiline = bool(value & 0x08)
+		elif value & 0x10:
+			if value & 0x08:
+				self.shift = (self.shift + (-1 if value & 0x04 else 1)) % (0x28 if self.multiline else 0x50)
+			elif self.address is not None:
+				self.address = self.next_address(self.address, forward = bool(value & 0x04))
+		elif value & 0x08:
+			# Display on/off control doesn't touch the address counter
+			pass
+		elif value & 0x04:
+			self.increment = bool(value & 0x02)
+		elif value & 0x02:
+			self.address = 0x00
+			self.cgram = False
+			self.shift = 0
+		elif value & 0x01:
+			self.ddram = [0x20] * 0x80
+			self.address = 0x00
+			self.cgram = False
+			self.increment = True
+			self.shift = 0
+	
+	def next_address(self, address, forward = None):
+		if forward is None:
+			forward = self.increment
+		address += 1 if forward else -1
+		if self.multiline:
+			# Two lines of 40 characters at 0x00 and 0x40
+			if address == 0x28:
+				address = 0x40
+			elif address == 0x68:
+				address = 0x00
+			elif address == 0x3F:
+				address = 0x27
+			elif address == -1:
+				address = 0x67
+		else:
+			address %= 0x50
+		return address
+
+class Marquee:
+	# Scrolls a line with display shifts. The DDRAM row holds the text once, longer text is
+	# fed in by rewriting each cell after it has left the visible window
+	def __init__(self, display, text, line = 0, gap = 4):
+		self.display = display
+		self.line = line
+		self.index, base = display.geometry[line]
+		controller = display.controllers[self.index]
+		self.length = 0x28 if controller.multiline else 0x50
+		self.row = base & 0x40 if controller.multiline else 0x00
+		for i, (index, address) in enumerate(display.geometry):
+			if i != line and index == self.index and (address & 0x40 if controller.multiline else 0x00) == self.row:
+				raise RuntimeError("Line %i shares its DDRAM row with line %i and can't be scrolled on its own." % (line, i))
+		text = display.expand_glyphs(text)
+		if len(text) + gap <= self.length:
+			text = text.ljust(self.length)
+		else:
+			text += " " * gap
+		self.text = text
+		self.start = base - self.row + controller.shift
+		self.position = 0
+		self.display.write_cells(dict([self.get_cell(i) for i in range(self.length)]))
+	
+	def get_cell(self, position):
+		return (self.index, self.row + (self.start + position) % self.length), ord(self.text[position % len(self.text)])
+	
+	def step(self):
+		# Display shifts move all lines, they should be blank or hold a marquee of the same length
+		self.display.scroll()
+		self.position += 1
+		# The cell that has just left the window on the left comes into view next on the right
+		self.display.write_cells(dict([self.get_cell(self.position - 1 + self.length)]))
+	
+	def stop(self):
+		# Undoes the display shift so later writes land in the visible cells again, and records
+		# what the row holds so the next update blanks it
+		self.display.home()
+		controller = self.display.controllers[self.index]
+		row = "".join([chr(controller.ddram[self.row + i]) for i in range(self.length)])
+		lines = list(self.display.lines) + [""] * (self.line + 1 - len(self.display.lines))
+		lines[self.line] = row
+		self.display.update_internal_lines(tuple(lines))
+
+class RefreshScheduler:
+	# Writes posted screen contents from a background thread, at most fps times per second.
+	# Posts that arrive between two flushes are merged so only the latest contents get written
+	def __init__(self, display, fps = 10.0, start = True):
+		self.display = display
+		self.interval = 1.0 / fps
+		self.condition = threading.Condition()
+		# Held while writing to the display, flush() may also be called from other threads
+		self.lock = threading.Lock()
+		# Pending screens as (lines, hold), only screens that have to be held are queued
+		self.screens = deque()
+		self.hold_until = 0.0
+		self.cells = OrderedDict()
+		self.sequence = None
+		self.posts = 0
+		self.flushes = 0
+		self.running = False
+		self.thread = None
+		if start:
+			self.start()
+	
+	def start(self):
+		with self.condition:
+			if self.running:
+				return
+			self.running = True
+		self.thread = threading.Thread(target = self.run)
+		self.thread.daemon = True
+		self.thread.start()
+	
+	def stop(self, flush = True):
+		with self.condition:
+			self.running = False
+			self.condition.notify()
+		if self.thread is not None:
+			self.thread.join()
+			self.thread = None
+		if flush:
+			while self.flush():
+				pass
+	
+	def post(self, string, hold = 0.0):
+		# Replaces the whole screen, including text posted to parts of it before, and ends a running sequence.
+		# The contents stay on the screen for at least hold seconds, later posts are written after that
+		with self.condition:
+			self.sequence = None
+			self.set_lines(string, hold)
+			self.condition.notify()
+	
+	def post_sequence(self, sequence):
+		# Posts the strings of an iterable of (string, hold) pairs one after another, taking the
+		# next one when the hold of the previous one has ended
+		with self.condition:
+			self.sequence = iter(sequence)
+			self.condition.notify()
+	
+	def set_lines(self, string, hold):
+		lines = list(string) if type(string) in (list, tuple) else self.display.split_lines(string)
+		if self.screens and not self.screens[-1][1]:
+			self.screens[-1] = (lines, hold)
+		else:
+			self.screens.append((lines, hold))
+		self.cells.clear()
+		self.posts += 1
+	
+	def post_cells(self, column, line, text):
+		with self.condition:
+			self.cells.pop((column, line), None)
+			self.cells[(column, line)] = text
+			self.posts += 1
+			self.condition.notify()
+	
+	def is_pending(self):
+		with self.condition:
+			return bool(self.screens) or bool(self.cells)
+	
+	def get_wait(self):
+		# Seconds until the next flush is due, None if nothing is pending
+		if not self.screens and not self.cells and self.sequence is None:
+			return None
+		return max(0.0, self.hold_until - time.time())
+	
+	def flush(self):
+		# Writes the next pending screen right away, even during a hold. Posted regions go with the last screen
+		with self.lock:
+			with self.condition:
+				lines, hold = self.screens.popleft() if self.screens else (None, 0.0)
+				if self.screens:
+					cells = {}
+				else:
+					cells = self.cells
+					self.cells = OrderedDict()
+			if lines is None and not cells:
+				return False
+			# Glyph escapes are expanded here so uploading glyphs happens on this thread too
+			if lines is not None:
+				self.display.update(self.display.expand_glyphs("\n".join(lines)).split("\n"))
+			for (column, line), text in cells.iteritems():
+				self.display.update_cells(column, line, self.display.expand_glyphs(text))
+			if lines is not None:
+				with self.condition:
+					self.hold_until = time.time() + hold
+			self.flushes += 1
+			return True
+	
+	def run(self):
+		while True:
+			with self.condition:
+				while self.running and self.get_wait() != 0.0:
+					self.condition.wait(self.get_wait())
+				if not self.running:
+					return
+				if self.sequence is not None and not self.screens and not self.cells:
+					try:
+						string, hold = next(self.sequence)
+					except StopIteration:
+						self.sequence = None
+						continue
+					self.set_lines(string, hold)
+			start = time.time()
+			try:
+				self.flush()
+			except:
+				warnings.warn("Refresh of the display failed", RuntimeWarning)
+			time.sleep(max(0.0, start + self.interval - time.time()))
+
 class Display:
 	CONTROL_CHARACTERS = (0x0D, 0x18, 0x1B, 0x7F)
 	
-	def __init__(self, backend, pinmap, charmap = None, lines = 2, columns = 16, characters = 80, backend_args = (), backend_kwargs = {}, skip_init = False, enable_backlight = True, debug = False):
+	# (controller, DDRAM address) of the first character of each line, by (columns, lines)
+	GEOMETRIES = {
+		(8, 1): ((0, 0x00), ),
+		(16, 1): ((0, 0x00), ),
+		(20, 1): ((0, 0x00), ),
+		(40, 1): ((0, 0x00), ),
+		(8, 2): ((0, 0x00), (0, 0x40)),
+		(16, 2): ((0, 0x00), (0, 0x40)),
+		(20, 2): ((0, 0x00), (0, 0x40)),
+		(24, 2): ((0, 0x00), (0, 0x40)),
+		(40, 2): ((0, 0x00), (0, 0x40)),
+		(16, 4): ((0, 0x00), (0, 0x40), (0, 0x10), (0, 0x50)),
+		(20, 4): ((0, 0x00), (0, 0x40), (0, 0x14), (0, 0x54)),
+		(40, 4): ((0, 0x00), (0, 0x40), (1, 0x00), (1, 0x40)),
+	}
+	
+	# Enable pin of each controller, panels with more than 80 characters use a second one
+	ENABLE_PINS = ('PIN_E', 'PIN_E2')
+	
+	# Unchanged cells that may be rewritten instead of setting the address counter
+	MAX_REWRITE = 1
+	
+	CGRAM_SLOTS = 8
+	
+	# Glyphs used by the big number and bar graph renderers, registered on first use unless
+	# a glyph of the same name has been registered already
+	BUILTIN_GLYPHS = {
+		'full': (0b11111, ) * 8,
+		'big_top': (0b11111, 0b11111, 0b00000, 0b00000, 0b00000, 0b00000, 0b00000, 0b00000),
+		'big_both': (0b11111, 0b11111, 0b00000, 0b00000, 0b00000, 0b00000, 0b11111, 0b11111),
+	}
+	for i in range(1, 5):
+		# Horizontal bars filled with i pixel columns from the left
+		BUILTIN_GLYPHS['hbar%i' % i] = ((0x1F << (5 - i)) & 0x1F, ) * 8
+	for i in range(1, 8):
+		# Vertical bars filled with i pixel rows from the bottom
+		BUILTIN_GLYPHS['vbar%i' % i] = (0b00000, ) * (8 - i) + (0b11111, ) * i
+	del i
+	
+	# Built-in glyphs that are taken from the character ROM instead if it has them
+	ROM_GLYPHS = {
+		'full': u"█",
+	}
+	
+	# Big numerals by number of rows, one string per row. F, U, L and B are the full block,
+	# top bar, bottom bar and both bars glyphs
+	BIG_DIGITS = {
+		2: {
+			'0': ("FUF", "FLF"),
+			'1': ("UF ", "LFL"),
+			'2': ("BBF", "FLL"),
+			'3': ("BBF", "LLF"),
+			'4': ("FLF", "  F"),
+			'5': ("FBB", "LLF"),
+			'6': ("FBB", "FLF"),
+			'7': ("UUF", "  F"),
+			'8': ("FBF", "FLF"),
+			'9': ("FBF", "LLF"),
+			'-': ("LLL", "   "),
+			' ': ("   ", "   "),
+			':': (".", "."),
+			'.': (" ", "."),
+		},
+		3: {
+			'0': ("FUF", "F F", "FLF"),
+			'1': ("UF ", " F ", "LFL"),
+			'2': ("UUF", "FUU", "FLL"),
+			'3': ("UUF", " UF", "LLF"),
+			'4': ("F F", "FLF", "  F"),
+			'5': ("FUU", "UUF", "LLF"),
+			'6': ("FUU", "FUF", "FLF"),
+			'7': ("UUF", "  F", "  F"),
+			'8': ("FUF", "FUF", "FLF"),
+			'9': ("FUF", "UUF", "LLF"),
+			'-': ("   ", "UUU", "   "),
+			' ': ("   ", "   ", "   "),
+			':': (".", " ", "."),
+			'.': (" ", " ", "."),
+		},
+	}
+	BIG_DIGIT_CELLS = {'F': 'full', 'U': 'big_top', 'L': 'vbar2', 'B': 'big_both', ' ': 0x20, '.': 0x2E}
+	
+	def __init__(self, backend, pinmap, charmap = None, lines = 2, columns = 16, characters = 80, geometry = None, rom = 'A00', backend_args = (), backend_kwargs = {}, skip_init = False, enable_backlight = True, debug = False):
 		self.backend = backend(self, pinmap, *backend_args, **backend_kwargs)
 		self.brightness = 0
 		self.debug = debug
 		self.line_count = lines
 		self.column_count = columns
 		self.character_count = characters
-		self.max_chars_per_line = self.character_count / lines
+		self.geometry = geometry or self.get_geometry(columns, lines)
+		# Unicode text is translated for the character ROM of the controller, A00 or A02
+		self.charset = CHARSETS[rom]
+		self.controllers = [Controller(self.ENABLE_PINS[i]) for i in range(max([controller for controller, address in self.geometry]) + 1)]
+		self.controller = self.controllers[0]
+		# The DDRAM cells every line has, 40 on panels with two lines per controller
+		self.max_chars_per_line = min([self.get_line_length(line) for line in range(len(self.geometry))])
+		# Use the 8-bit interface if the lower data lines are connected
+		self.eight_bit = all(['D%i' % i in pinmap for i in range(4)])
 		self.lines = ()
 		self.cursor_pos = [0, 0]
+		# Registered glyphs by name, the glyph in each CGRAM slot and the slots of resident glyphs by last use
+		self.glyphs = {}
+		self.cgram = [None] * self.CGRAM_SLOTS
+		self.glyph_slots = OrderedDict()
+		self.pinned_slots = set()
 		self.set_brightness = self.backend.set_brightness
 		self.write_nibble = self.backend.write_nibble
+		self.write_nibble_value = self.backend.write_nibble_value
+		self.write_byte_value = self.backend.write_byte_value
 		self.backend.all_low()
 		if enable_backlight:
 			self.set_brightness(1023)
@@ -52,15 +388,94 @@ class Display:
 	def write_value(self, value, data = True):
 		if self.debug:
 			print "Writing   %i / %s / %s / %s" % (value, hex(value), bin(value), chr(value))
-		nibbles = value_to_nibbles(value)
 		if data:
 			self.backend.high(self.backend.PIN_RS)
 			self.cursor_pos[0] += 1
-		self.write_nibble(nibbles[0], data = data)
-		self.backend.pulse(self.backend.PIN_E)
-		self.write_nibble(nibbles[1], data = data)
-		self.backend.pulse(self.backend.PIN_E)
-		self.write_nibble((False, False, False, False), data = False)
+			controllers = self.controllers if self.controller.cgram else [self.controller]
+			for controller in controllers:
+				controller.track_data(value)
+		else:
+			# DDRAM addressing and cursor moves go to the selected controller, everything else to all of them
+			controllers = [self.controller] if value & 0x80 or value & 0xF8 == 0x10 else self.controllers
+			for controller in controllers:
+				controller.track_command(value)
+		if self.eight_bit:
+			# The backends put the most significant bit on D0, the HD44780 expects it on D7
+			self.write_byte_value(REVERSED_BYTES[value], data = data)
+			self.pulse_enable(controllers)
+		else:
+			self.write_nibble_value(value >> 4, data = data)
+			self.pulse_enable(controllers)
+			self.write_nibble_value(value & 0x0F, data = data)
+			self.pulse_enable(controllers)
+			self.write_nibble_value(0, data = False)
+	
+	def pulse_enable(self, controllers = None):
+		for controller in controllers or self.controllers:
+			self.backend.pulse(getattr(self.backend, controller.enable_pin))
+	
+	def get_geometry(self, columns, lines):
+		if (columns, lines) in self.GEOMETRIES:
+			return self.GEOMETRIES[(columns, lines)]
+		if lines * columns > 80:
+			raise ValueError("No geometry known for %ix%i displays, pass it explicitly." % (columns, lines))
+		# Lines 3 and 4 continue lines 1 and 2 in DDRAM on single controller panels
+		return tuple([(0, (0x40 if line % 2 else 0x00) + (columns if line >= 2 else 0)) for line in range(lines)])
+	
+	def get_address(self, column, line):
+		controller, address = self.geometry[line]
+		return controller, address + column
+	
+	def get_line_length(self, line):
+		# Number of DDRAM cells from the start of the line to the end of its row or the next line in that row
+		index, base = self.geometry[line]
+		if self.controllers[index].multiline:
+			end = (base & 0x40) + 0x28
+		else:
+			end = 0x50
+		for _index, address in self.geometry:
+			if _index == index and base < address < end:
+				end = address
+		return end - base
+	
+	def get_position(self, controller, address):
+		line = max([i for i in range(len(self.geometry)) if self.geometry[i][0] == controller and self.geometry[i][1] <= address], key = lambda i: self.geometry[i][1])
+		return [address - self.geometry[line][1], line]
+	
+	def set_address(self, controller, address):
+		self.controller = self.controllers[controller]
+		self.write_value(0x80 + address, data = False)
+		self.cursor_pos = self.get_position(controller, address)
+	
+	def write_cells(self, cells):
+		# cells maps (controller, DDRAM address) to character codes. Each controller sends the
+		# characters that differ from its shadow, relying on the address counter and rewriting
+		# short runs of unchanged cells where that is cheaper than a jump
+		for index, controller in enumerate(self.controllers):
+			changed = sorted([address for (_index, address), value in cells.iteritems() if _index == index and controller.ddram[address] != value], reverse = not controller.increment)
+			for address in changed:
+				gap = []
+				current = controller.address if controller is self.controller else None
+				while current is not None and current != address and len(gap) <= self.MAX_REWRITE:
+					gap.append(current)
+					current = controller.next_address(current)
+				if current != address or len(gap) > self.MAX_REWRITE or None in [controller.ddram[cell] for cell in gap]:
+					self.set_address(index, address)
+				else:
+					for cell in gap:
+						self.write_value(controller.ddram[cell])
+				self.write_value(cells[(index, address)])
+	
+	def update_cells(self, column, line, text):
+		text = self.charset.encode(text)
+		cells = {}
+		for i, char in enumerate(text[:max(self.get_line_length(line) - column, 0)]):
+			cells[self.get_address(column + i, line)] = ord(char)
+		self.write_cells(cells)
+		lines = list(self.lines) + [""] * (line + 1 - len(self.lines))
+		old_line = lines[line].ljust(column)
+		lines[line] = old_line[:column] + text + old_line[column + len(text):]
+		self.update_internal_lines(tuple(lines))
 	
 	def update_internal_lines(self, lines):
 		self.lines = lines
@@ -69,13 +484,21 @@ class Display:
 		lines = string.splitlines()
 		return lines
 	
-	def _custom_sub(self, match):
-		num = int(match.groupdict()['num'])
-		return chr(num)
+	def expand_glyphs(self, string):
+		# Encodes the string for the character ROM, replacing <n> with CGRAM slot n and <name> with the slot
+		# of a registered glyph, uploading it if needed
+		parts = self.charset.compile(string)
+		if len(parts) == 1:
+			return parts[0]
+		names = [name for name in set(parts[1::2]) if name in self.glyphs]
+		slots = self.get_glyph_slots(names) if names else {}
+		return "".join([(chr(slots[part]) if part in slots else "<%s>" % part) if i % 2 else part for i, part in enumerate(parts)])
 	
 	def write_string(self, string, parse_custom = True, update = False, align = 'left'):
 		if parse_custom:
-			string = re.sub(r"<(?P<num>[0-7])>", self._custom_sub, string)
+			string = self.expand_glyphs(string)
+		else:
+			string = self.charset.encode(string)
 		
 		lines = self.split_lines(string)
 		if align == 'left':
@@ -94,6 +517,14 @@ class Display:
 		self.update_internal_lines(lines)
 	
 	def cycle_strings(self, strings, delay = 5.0, count = -1, *args, **kwargs):
+		# With a RefreshScheduler passed as scheduler, the strings are posted as they are and this returns at once
+		scheduler = kwargs.pop('scheduler', None)
+		if scheduler is not None:
+			if args or kwargs:
+				raise TypeError("write_string options can't be used with a scheduler.")
+			cycles = itertools.repeat(strings) if count == -1 else itertools.repeat(strings, count)
+			scheduler.post_sequence((string, delay) for cycle in cycles for string in cycle)
+			return
 		i = 0
 		while count == -1 or i < count:
 			i += 1
@@ -101,28 +532,47 @@ class Display:
 				self.write_string(string, *args, **kwargs)
 				time.sleep(delay)
 	
+	def marquee(self, text, line = 0, delay = 0.3, count = -1, gap = 4):
+		marquee = Marquee(self, text, line, gap)
+		i = 0
+		try:
+			while count == -1 or i < count:
+				i += 1
+				time.sleep(delay)
+				marquee.step()
+		finally:
+			marquee.stop()
+		return marquee
+	
 	def update(self, string):
-		lines = self.split_lines(string)
-		old_lines = self.lines[:]
-		lens = [len(line) for line in lines]
-		old_lens = [len(line) for line in old_lines]
-		for i in range(len(lines)):
-			for n in range(lens[i]):
-				if lines[i][n] != old_lines[i][n:n + 1]:
-					self.set_cursor_position(n, i)
-					self.write_value(ord(lines[i][n]))
-			if lens[i] < old_lens[i]:
-				self.set_cursor_position(lens[i], i)
-				self.write_string(" " * (old_lens[i] - lens[i]))
+		if type(string) in (list, tuple):
+			lines = list(string)
+		else:
+			lines = self.split_lines(string)
+		lines = [self.charset.encode(line) for line in lines]
+		old_lens = [len(line) for line in self.lines]
+		cells = {}
+		for i in range(min(len(lines), self.line_count)):
+			# Blank what is left of the previous text on this line
+			line = lines[i].ljust(old_lens[i] if i < len(old_lens) else 0)
+			for n in range(min(len(line), self.get_line_length(i))):
+				cells[self.get_address(n, i)] = ord(line[n])
+		self.write_cells(cells)
 		self.update_internal_lines(lines)
 	
 	def initialize(self):
-		self.write_nibble((False, False, True, True), data = False)
-		self.backend.pulse(self.backend.PIN_E)
-		self.backend.pulse(self.backend.PIN_E)
-		self.backend.pulse(self.backend.PIN_E)
-		self.write_nibble((False, False, True, False), data = False)
-		self.backend.pulse(self.backend.PIN_E)
+		if self.eight_bit:
+			self.write_byte_value(REVERSED_BYTES[0b00110000], data = False)
+			self.pulse_enable()
+			self.pulse_enable()
+			self.pulse_enable()
+		else:
+			self.write_nibble((False, False, True, True), data = False)
+			self.pulse_enable()
+			self.pulse_enable()
+			self.pulse_enable()
+			self.write_nibble((False, False, True, False), data = False)
+			self.pulse_enable()
 		self.set_configuration(multiline = True)
 		self.set_display_enable(enable = True, cursor = False)
 	
@@ -159,22 +609,19 @@ class Display:
 	def set_configuration(self, multiline = True, five_seven_font = True):
 		_multiline = 0b00001000 if multiline else 0b00000000
 		_five_seven_font = 0b00000100 if five_seven_font else 0b00000000
-		self.write_value(0b00100000 + _multiline + _five_seven_font, data = False)
+		_eight_bit = 0b00010000 if self.eight_bit else 0b00000000
+		self.write_value(0b00100000 + _eight_bit + _multiline + _five_seven_font, data = False)
 	
 	def set_cursor_position(self, column = 0, line = 0):
-		if line == 1:
-			_line = 0xC0
-		elif line == 2:
-			_line = 0x90
-		elif line == 3:
-			_line = 0xD0
-		else:
+		if line not in range(len(self.geometry)):
 			line = 0
-			_line = 0x80
+		controller, address = self.get_address(column, line)
+		self.controller = self.controllers[controller]
+		self.write_value(0x80 + address, data = False)
 		self.cursor_pos = [column, line]
-		self.write_value(_line + column, data = False)
 	
 	def char_from_file(self, f):
+		from PIL import Image
 		image = Image.open(f)
 		pixels = image.load()
 		f.close()
@@ -190,16 +637,111 @@ class Display:
 		char = tuple(char)
 		return char
 	
-	def load_custom_character(self, pos, char):
+	def load_custom_character(self, pos, char, pin = True):
 		if type(char) is file:
 			_char = self.char_from_file(char)
 			if not _char:
 				return False
 		else:
-			_char = char
+			_char = tuple(char)
+		if pin:
+			# Slots loaded directly are used through <n> and never reassigned
+			self.pinned_slots.add(pos)
+			for name, slot in self.glyph_slots.items():
+				if slot == pos:
+					del self.glyph_slots[name]
+		if self.cgram[pos] == _char:
+			return
+		# The CGRAM address counter increments after each row
+		self.write_value(0b01000000 + (pos << 3), data = False)
 		for i in range(8):
-			self.write_value(0b01000000 + (pos << 3) + i, data = False)
 			self.write_value(_char[i])
+		self.cgram[pos] = _char
+	
+	def register_glyph(self, name, char):
+		if type(char) is file:
+			char = self.char_from_file(char)
+			if not char:
+				return False
+		self.glyphs[name] = tuple(char)
+		if name in self.glyph_slots:
+			self.load_custom_character(self.glyph_slots[name], self.glyphs[name], pin = False)
+	
+	def get_glyph_slots(self, names):
+		# Assigns CGRAM slots to the glyphs of a frame, evicting the least recently used glyphs the frame doesn't need
+		slots = {}
+		for name in names:
+			if name in self.glyph_slots:
+				slots[name] = self.glyph_slots.pop(name)
+				self.glyph_slots[name] = slots[name]
+		for name in names:
+			if name in slots:
+				continue
+			used = self.pinned_slots | set(self.glyph_slots.values())
+			free = [slot for slot in range(self.CGRAM_SLOTS) if slot not in used]
+			if free:
+				# Prefer a slot that already holds the glyph
+				matching = [slot for slot in free if self.cgram[slot] == self.glyphs[name]]
+				slot = (matching or free)[0]
+			else:
+				evictable = [_name for _name in self.glyph_slots if _name not in slots]
+				if not evictable:
+					raise RuntimeError("A frame can't use more than %i custom characters." % (self.CGRAM_SLOTS - len(self.pinned_slots)))
+				slot = self.glyph_slots.pop(evictable[0])
+			self.glyph_slots[name] = slot
+			slots[name] = slot
+			self.load_custom_character(slot, self.glyphs[name], pin = False)
+		return slots
+	
+	def get_builtin_glyph_slots(self, names):
+		for name in names:
+			if name not in self.glyphs:
+				self.register_glyph(name, self.BUILTIN_GLYPHS[name])
+		return self.get_glyph_slots(names)
+	
+	def update_block(self, column, line, rows):
+		# rows are lists of character codes or glyph names, clipped to the display
+		names = set([cell for row in rows for cell in row if type(cell) is str])
+		slots = {}
+		for name in list(names):
+			if name in self.ROM_GLYPHS and name not in self.glyphs and self.charset.is_available(self.ROM_GLYPHS[name]):
+				slots[name] = ord(self.charset.encode(self.ROM_GLYPHS[name]))
+				names.remove(name)
+		slots.update(self.get_builtin_glyph_slots(names))
+		for i, row in enumerate(rows[:self.line_count - line]):
+			row = row[:self.column_count - column]
+			self.update_cells(column, line + i, "".join([chr(slots[cell] if type(cell) is str else cell) for cell in row]))
+	
+	def big_number(self, text, column = 0, line = 0, rows = 2, spacing = 1):
+		font = self.BIG_DIGITS[rows]
+		chars = [font[char] for char in str(text)]
+		block = []
+		for i in range(rows):
+			row = (" " * spacing).join([char[i] for char in chars])
+			block.append([self.BIG_DIGIT_CELLS[cell] for cell in row])
+		self.update_block(column, line, block)
+		return len(block[0])
+	
+	def bar_graph(self, fraction, column = 0, line = 0, size = None, vertical = False):
+		# Draws a bar with single pixel resolution, growing to the right or, if vertical, upwards from line
+		fraction = min(max(fraction, 0.0), 1.0)
+		if size is None:
+			size = (line + 1) if vertical else (self.column_count - column)
+		steps = 8 if vertical else 5
+		filled = int(round(fraction * size * steps))
+		cells = []
+		for i in range(size):
+			pixels = min(max(filled - i * steps, 0), steps)
+			if pixels == steps:
+				cells.append('full')
+			elif pixels:
+				cells.append(('vbar%i' if vertical else 'hbar%i') % pixels)
+			else:
+				cells.append(0x20)
+		if vertical:
+			self.update_block(column, line - size + 1, [[cell] for cell in reversed(cells)])
+		else:
+			self.update_block(column, line, [cells])
 	
 	def backspace(self):
 		self.move_cursor(left = True)
@@ -267,6 +809,9 @@ class DisplayUI:
 	KEY_DOWN = "\x1b[B"
 	KEY_ENTER = chr(13)
 	
+	# Entries pulled from iterables beyond the last visible one
+	LIST_LOOKAHEAD = 4
+	
 	class ProgressBar:
 		def __init__(self, ui, title, fraction, char, align):
 			self.ui = ui
@@ -282,8 +827,39 @@ class DisplayUI:
 			self.align = align or self.align
 			self = self.ui.progress_bar(title = self.title, fraction = self.fraction, char = self.char, align = self.align)
 	
-	def __init__(self, display, input_module, input_args = (), input_kwargs = {}, debug = False):
+	class EntryList:
+		# Random access to the entries of a dialog, items of iterables are only pulled as far as they are needed
+		def __init__(self, entries):
+			if hasattr(entries, '__getitem__') and hasattr(entries, '__len__'):
+				self.items = entries
+				self.iterator = None
+			else:
+				self.items = []
+				self.iterator = iter(entries)
+		
+		def fetch(self, count):
+			while self.iterator is not None and len(self.items) < count:
+				try:
+					self.items.append(self.iterator.next())
+				except StopIteration:
+					self.iterator = None
+			return len(self.items) >= count
+		
+		def has(self, index):
+			return self.fetch(index + 1)
+		
+		def window(self, start, stop, lookahead = 0):
+			self.fetch(stop + lookahead)
+			return self.items[start:stop]
+		
+		def __getitem__(self, index):
+			self.fetch(index + 1)
+			return self.items[index]
+	
+	def __init__(self, display, input_module, input_args = (), input_kwargs = {}, scheduler = None, debug = False):
 		self.debug = debug
+		# RefreshScheduler to post redraws to instead of writing them on the calling thread
+		self.scheduler = scheduler
 		self.current_lines = ()
 		self.display = display
 		self.displayed_lines = ()
@@ -337,17 +913,20 @@ class DisplayUI:
 		self.line_buffer += [""] * (self.display.line_count - len(self.line_buffer))
 		self.v_scroll_pos = min(len(self.line_buffer) - self.display.line_count, self.v_scroll_pos)
 		lines = self.line_buffer[self.v_scroll_pos:self.v_scroll_pos + self.display.line_count]
-		self.stored_lines = tuple([line[:self.display.column_count].ljust(self.display.column_count) if i < 2 and self.display.line_count > 2 else line[:self.display.max_chars_per_line].ljust(self.display.max_chars_per_line) for i, line in enumerate(lines)])
 		self.displayed_lines = tuple([line[:self.display.column_count].ljust(self.display.column_count) if i < 2 and self.display.line_count > 2 else line[:self.display.max_chars_per_line].ljust(self.display.max_chars_per_line) for i, line in enumerate(lines)])
+		self.stored_lines = self.displayed_lines
 		self.viewport = tuple([self._shift(line, -self.h_scroll_pos)[:self.display.column_count] for line in self.displayed_lines])
 	
-	def redraw(self):
+	def redraw(self, hold = 0.0):
 		if self.debug:
 			header = "╔%s╗" % ("═" * self.display.column_count)
 			footer = "╚%s╝" % ("═" * self.display.column_count)
 			print header + "\n%s\n" % "\n".join(["║%s║" % line.ljust(self.display.column_count) for line in self.viewport]) + footer
-		self.display.set_cursor_position(0, 0)
-		self.display.write("\n".join(self.stored_lines))
+		if self.scheduler is not None:
+			self.scheduler.post(self.stored_lines, hold = hold)
+			return
+		# Only the cells that differ from the DDRAM shadow are written
+		self.display.write_string("\n".join(self.stored_lines), update = True)
 	
 	def clear(self):
 		self.line_buffer = []
@@ -360,9 +939,31 @@ class DisplayUI:
 		row = ("%s" * len(buttons)) % tuple([("<%s>" if active == buttons.index(button) else " %s ") % button[0][:btn_width].center(btn_width) for button in buttons])
 		return row
 	
-	def format_list_entries(self, entries, align = 'center', active = 0):
+	def _list_entry(self, entry):
+		return (entry, None) if type(entry) in [str, unicode] else entry
+	
+	def _scroll_to_entry(self, active, top):
+		# Returns the first visible line of the title and entries so the active entry is on the display
+		line = active + 1
+		if active == 0:
+			return 0
+		elif line < top:
+			return line
+		elif line >= top + self.display.line_count:
+			return line - self.display.line_count + 1
+		return top
+	
+	def _entry_window(self, title, entries, top, format):
+		# Formats the title and the entries from line top onwards, only as many as fit on the display
+		lines = [title] if top == 0 else []
+		first = max(0, top - 1)
+		window = entries.window(first, first + self.display.line_count - len(lines), self.LIST_LOOKAHEAD)
+		return lines + list(format(window, first))
+	
+	def format_list_entries(self, entries, align = 'center', active = 0, first = 0):
+		# first is the index of entries[0], for formatting a part of a list
 		entry_width = self.display.column_count - 2
-		rows = tuple([("<%s>" if active == entries.index(entry) else " %s ") % self._align(entry[0][:entry_width], align, entry_width) for entry in entries])
+		rows = tuple([("<%s>" if active == first + i else " %s ") % self._align(entry[0][:entry_width], align, entry_width) for i, entry in enumerate(entries)])
 		return rows
 	
 	def format_lines(self, lines, align = 'left', wrap = True):
@@ -389,14 +990,16 @@ class DisplayUI:
 		row = str(value).ljust(val_width) + _row
 		return row
 	
-	def format_multiple_choice_entries(self, entries, align = 'center', active = 0, selected = [], char = "*"):
+	def format_multiple_choice_entries(self, entries, align = 'center', active = 0, selected = [], char = "*", first = 0):
 		entry_width = self.display.column_count - 4
+		if type(selected) is not set:
+			selected = set(selected)
 		rows = []
-		for entry in entries:
-			if entries.index(entry) == active:
-				row = ("[%s] %%s" % char if entries.index(entry) in selected else "[ ] %s") % self._align(entry[:entry_width], align, entry_width)
+		for index, entry in enumerate(entries, first):
+			if index == active:
+				row = ("[%s] %%s" % char if index in selected else "[ ] %s") % self._align(entry[:entry_width], align, entry_width)
 			else:
-				row = (" %s  %%s" % char if entries.index(entry) in selected else "    %s") % self._align(entry[:entry_width], align, entry_width)
+				row = (" %s  %%s" % char if index in selected else "    %s") % self._align(entry[:entry_width], align, entry_width)
 			rows.append(row)
 		rows = tuple(rows)
 		return rows
@@ -447,25 +1050,23 @@ class DisplayUI:
 	
 	def list_dialog(self, title, entries, align = 'left', active = 0, onchange = None, onchange_args = (), onchange_kwargs = {}):
 		done = False
-		first_loop = True
+		title = self._align(title, align)
+		entries = self.EntryList(entries)
+		top = 0
 		while not done:
-			title = self._align(title, align)
-			entries = tuple([(entry, None) if type(entry) in [str, unicode] else entry for entry in entries])
-			entry_rows = self.format_list_entries(entries, align = align, active = active)
-			self.update([title] + list(entry_rows), home = first_loop)
+			# Only the entries on the display are formatted
+			top = self._scroll_to_entry(active, top)
+			lines = self._entry_window(title, entries, top, lambda window, first: self.format_list_entries([self._list_entry(entry) for entry in window], align = align, active = active, first = first))
+			self.update(lines)
 			self.redraw()
-			first_loop = False
 			key = None
 			while key is None:
 				key = self.input.read_key()
 			if key == self.KEY_UP:
 				active = max(0, active - 1)
-				if active < self.v_scroll_pos - 1 or (active == 0 and divmod(len(entries), 2)[1] == 0):
-					self.v_scroll(-2, redraw = False)
 			elif key == self.KEY_DOWN:
-				active = min(active + 1, len(entries) - 1)
-				if active > self.v_scroll_pos:
-					self.v_scroll(2, redraw = False)
+				if entries.has(active + 1):
+					active += 1
 			elif key == self.KEY_ENTER:
 				done = True
 			if onchange:
@@ -473,7 +1074,7 @@ class DisplayUI:
 					onchange(active, *onchange_args, **onchange_kwargs)
 				except:
 					warnings.warn("On-Change function of list dialog element failed", RuntimeWarning)
-		selected = entries[active]
+		selected = self._list_entry(entries[active])
 		if selected[1]:
 			try:
 				selected[1][0](*selected[1][1], **selected[1][2])
@@ -536,13 +1137,15 @@ class DisplayUI:
 	
 	def multiple_choice_dialog(self, title, entries, align = 'left', active = 0, selected = [], char = "*", onchange = None, onchange_args = (), onchange_kwargs = {}):
 		done = False
-		first_loop = True
+		title = self._align(title, align)
+		entries = self.EntryList(entries)
+		selected = set(selected)
+		top = 0
 		while not done:
-			title = self._align(title, align)
-			entry_rows = self.format_multiple_choice_entries(entries, align = align, active = active, selected = selected, char = char)
-			self.update([title] + list(entry_rows), home = first_loop)
+			top = self._scroll_to_entry(active, top)
+			lines = self._entry_window(title, entries, top, lambda window, first: self.format_multiple_choice_entries(window, align = align, active = active, selected = selected, char = char, first = first))
+			self.update(lines)
 			self.redraw()
-			first_loop = False
 			key = None
 			while key is None:
 				key = self.input.read_key()
@@ -550,20 +1153,17 @@ class DisplayUI:
 				if active in selected:
 					selected.remove(active)
 				else:
-					selected.append(active)
+					selected.add(active)
 			elif key == self.KEY_UP:
 				active = max(0, active - 1)
-				if active < self.v_scroll_pos - 1 or (active == 0 and divmod(len(entries), 2)[1] == 0):
-					self.v_scroll(-2, redraw = False)
 			elif key == self.KEY_DOWN:
-				active = min(active + 1, len(entries) - 1)
-				if active > self.v_scroll_pos:
-					self.v_scroll(2, redraw = False)
+				if entries.has(active + 1):
+					active += 1
 			elif key == self.KEY_ENTER:
 				done = True
 			if onchange:
 				try:
-					onchange(selected, *onchange_args, **onchange_kwargs)
+					onchange(sorted(selected), *onchange_args, **onchange_kwargs)
 				except:
 					warnings.warn("On-Change function of multiple choice dialog element failed", RuntimeWarning)
 		selected = [(i, entries[i]) for i in sorted(selected)]
@@ -574,8 +1174,10 @@ class DisplayUI:
 			data = data.splitlines()
 		data = self.format_lines(data, align, wrap)
 		self.update(data)
-		self.redraw()
-		time.sleep(duration)
+		# With a scheduler the message is held on the screen for duration instead of blocking
+		self.redraw(hold = duration)
+		if self.scheduler is None:
+			time.sleep(duration)
 	
 	def v_scroll(self, amount = 1, to = None, redraw = True):
 		if to is not None:
@@ -597,7 +1199,8 @@ class DisplayUI:
 		self.h_scroll_pos += amount
 		while self.h_scroll_pos < 0:
 			self.h_scroll_pos = self.display.max_chars_per_line * 2 + self.h_scroll_pos
-		self.update(home = False)
+		# The display shift moved the content, only the viewport has to follow
+		self.viewport = tuple([self._shift(line, -self.h_scroll_pos)[:self.display.column_count] for line in self.displayed_lines])
 	
 	def dim(self, level, animate = True, delay = 0.001, duration = None):
 		if level == self.display.brightness:
@@ -9,22 +9,119 @@ Library for KS0108 compatible graphical LCDs
 import json
 import math
 import os
+import pkgutil
 import re
 import time
-import PyQRNative as qr
 
+from collections import deque
 from copy import deepcopy
-try:
-	from PIL import Image, ImageDraw, ImageFont
-except ImportError:
-	IMAGE = False
-else:
-	IMAGE = True
 
 from .backends import *
 from .inputs import *
 from .utils import *
 
+# Whether PIL is installed, found without importing it. PIL itself is imported on first use
+IMAGE = pkgutil.find_loader('PIL') is not None
+
+# The pixel list of every possible page value, bit n of the value is row n of the page
+PAGE_BITS = tuple([tuple([(value >> bit) & 1 for bit in range(8)]) for value in range(256)])
+
+# Function samples of recent function plots, keyed by (cache key, min_x, max_x, width)
+FUNCTION_PLOT_CACHE = LRUCache(16)
+QR_MATRIX_CACHE = LRUCache(16)
+QR_BLIT_CACHE = LRUCache(16)
+
+def _import_pil(purpose):
+	# PIL is only imported on first use to keep the import of pylcd fast
+	try:
+		from PIL import Image, ImageDraw, ImageFont
+	except ImportError:
+		raise RuntimeError("PIL is required to %s, but it is not installed on your system." % purpose)
+	return Image, ImageDraw, ImageFont
+
+def _sample_function(func, min_x, x_step, count):
+	# Samples func at min_x + x_step * i for i in range(-1, count)
+	try:
+		import numpy
+	except ImportError:
+		pass
+	else:
+		try:
+			values = numpy.asarray(func(numpy.arange(-1, count) * x_step + min_x), dtype = float)
+		except (TypeError, ValueError):
+			# The function only takes scalars
+			pass
+		else:
+			# Anything but one value per sample, like a reading that ignores its argument, is sampled one value at a time
+			if values.shape == (count + 1, ):
+				return values.tolist()
+	return [func(min_x + x_step * i) for i in range(-1, count)]
+
+def _to_points(points):
+	# Accepts lists, tuples, NumPy arrays and other iterables of values or (x, y) pairs
+	if hasattr(points, 'tolist'):
+		points = points.tolist()
+	else:
+		points = list(points)
+	if points and type(points[0]) in (int, long, float):
+		points = [(x, value) for x, value in enumerate(points)]
+	return points
+
+def downsample_minmax(points, to_column):
+	# Keeps the first, the lowest, the highest and the last point of every pixel column, in their original order.
+	# Connecting the remaining points draws the same pixels as connecting all of them.
+	points = _to_points(points)
+	sampled = []
+	bucket = None
+	for index, point in enumerate(points):
+		column = to_column(point[0])
+		if column != bucket:
+			if bucket is not None:
+				sampled += [points[i] for i in sorted(set((first, low, high, index - 1)))]
+			bucket = column
+			first = low = high = index
+		elif point[1] < points[low][1]:
+			low = index
+		elif point[1] > points[high][1]:
+			high = index
+	if bucket is not None:
+		sampled += [points[i] for i in sorted(set((first, low, high, len(points) - 1)))]
+	return sampled
+
+def downsample_lttb(points, threshold):
+	# Largest-Triangle-Three-Buckets, expects the points to be sorted by x
+	points = _to_points(points)
+	length = len(points)
+	if threshold >= length or threshold < 3:
+		return points
+	sampled = [points[0]]
+	bucket_size = (length - 2) / float(threshold - 2)
+	a = 0
+	for i in range(threshold - 2):
+		# Average of the next bucket
+		avg_start = int((i + 1) * bucket_size) + 1
+		avg_end = min(int((i + 2) * bucket_size) + 1, length)
+		avg_x = avg_y = 0.0
+		for point in points[avg_start:avg_end]:
+			avg_x += point[0]
+			avg_y += point[1]
+		avg_x /= avg_end - avg_start
+		avg_y /= avg_end - avg_start
+		
+		# Point of the current bucket forming the largest triangle
+		a_x, a_y = points[a]
+		max_area = -1
+		for j in range(int(i * bucket_size) + 1, int((i + 1) * bucket_size) + 1):
+			x, y = points[j]
+			area = abs((a_x - avg_x) * (y - a_y) - (a_x - x) * (avg_y - a_y))
+			if area > max_area:
+				max_area = area
+				next_a = j
+		sampled.append(points[next_a])
+		a = next_a
+	sampled.append(points[-1])
+	return sampled
+
 class Display:
 	def __init__(self, backend, pinmap, auto_commit = False, backend_args = (), backend_kwargs = {}, skip_init = False, enable_backlight = True, debug = False):
 		self.backend = backend(self, pinmap, *backend_args, **backend_kwargs)
@@ -36,10 +133,13 @@ class Display:
 		self.pages = self.rows / 8
 		self.content = [[[0 for z in range(8)] for x in range(self.pages)] for y in range(self.columns)]
 		self.old_content = deepcopy(self.content)
+		self.start_line = 0
+		self.old_start_line = 0
 		self.cursor_pos = [0, 0]
 		self.current_chip = 1
 		self.set_brightness = self.backend.set_brightness
 		self.write_byte = self.backend.write_byte
+		self.write_byte_value = self.backend.write_byte_value
 		self.backend.all_low()
 		if enable_backlight:
 			self.set_brightness(1023)
@@ -55,6 +155,8 @@ class Display:
 	def commit(self, full = False, live = True):
 		if not live:
 			self.set_display_enable(False)
+		if self.start_line != self.old_start_line:
+			self.set_start_line(self.start_line)
 		self.set_cursor_position(0, 0, force = True)
 		for y in range(self.pages):
 			for x in range(self.columns):
@@ -69,10 +171,8 @@ class Display:
 	def write_value(self, value, chip = None, data = True):
 		if chip is None:
 			chip = self.current_chip
-		byte = value_to_byte(value)
-		# print " ".join([str(int(bit)) for bit in reversed(byte)])
 		self.backend.high(getattr(self.backend, "PIN_CS%i" % chip))
-		self.write_byte(byte, data = data)
+		self.write_byte_value(value, data = data)
 		self.backend.pulse(self.backend.PIN_E)
 		self.backend.low(getattr(self.backend, "PIN_CS%i" % chip))
 	
@@ -121,8 +221,26 @@ class Display:
 	
 	def set_start_line(self, line = 0):
 		self.backend.high(self.backend.PIN_CS2)
-		self.write_value(0b00000011 + (line << 2), chip = 1, data = False)
+		self.write_value(int(bin(int(bin(line)[2:].rjust(6, "0")[::-1], 2))[2:] + "11", 2), chip = 1, data = False)
 		self.backend.low(self.backend.PIN_CS2)
+		self.start_line = self.old_start_line = line
+	
+	def scroll(self, rows = 1, clear = True):
+		# Moves the content up (or down, if negative) by changing the start line on the next commit
+		# The framebuffer is circular, so the rows scrolled out become the newly exposed ones
+		rows = max(-self.rows, min(rows, self.rows))
+		if rows >= 0:
+			exposed = [(self.start_line + i) % self.rows for i in range(rows)]
+		else:
+			exposed = [(self.start_line + i) % self.rows for i in range(rows, 0)]
+		self.start_line = (self.start_line + rows) % self.rows
+		if clear:
+			for row in exposed:
+				page, pos = divmod(row, 8)
+				for x in range(self.columns):
+					self.content[x][page][pos] = 0
+		if self.auto_commit:
+			self.commit()
 	
 	def write_page(self, value, column = None, page = None, commit = False):
 		# print "Writing%s page %s in column %s: %s" % (" and committing" if commit else "", page, column, bin(value)[2:].rjust(8, "0"))
@@ -144,8 +262,7 @@ class Display:
 
 class SimulatedDisplay(Display):
 	def __init__(self, *args, **kwargs):
-		if not IMAGE:
-			raise RuntimeError("PIL is required to display images, but it is not installed on your system.")
+		Image, ImageDraw, ImageFont = _import_pil("display images")
 		Display.__init__(self, *args, **kwargs)
 		self.outfile = "display.png"
 		self.bg = (0, 0, 255)
@@ -157,8 +274,9 @@ class SimulatedDisplay(Display):
 			self.image.save(self.outfile, "PNG")
 		self.pixels = self.image.load()
 	
-	def commit(self, *args, **kwargs):
-		Display.commit(self, *args, **kwargs)
+	def commit(self, full = False, live = True):
+		# A new start line moves every row of the simulated screen
+		Display.commit(self, full = full or self.start_line != self.old_start_line, live = live)
 		self.image.save(self.outfile, "PNG")
 	
 	def write_page(self, value, column = None, page = None, commit = False):
@@ -172,7 +290,7 @@ class SimulatedDisplay(Display):
 			byte = value_to_byte(value)
 			self.set_cursor_position(column, page * 8)
 			for i in range(len(byte)):
-				self.pixels[column, (page * 8) + i] = self.fg if byte[i] else self.bg
+				self.pixels[column, (page * 8 + i - self.start_line) % self.rows] = self.fg if byte[i] else self.bg
 			self.set_cursor_position(column + 1, page * 8, internal = True)
 		else:
 			self.content[column][page] = [int(item) for item in value_to_byte(value)]
@@ -180,6 +298,245 @@ class SimulatedDisplay(Display):
 				self.commit()
 
 class DisplayDraw:
+	class StripChart:
+		def __init__(self, draw, start_x, start_y, end_x, end_y, range_y = None, x_axis = True, y_axis = True):
+			self.draw = draw
+			self.start_x = start_x
+			self.start_y = start_y
+			self.end_x = end_x
+			self.end_y = end_y
+			self.width = end_x - start_x + 1
+			self.height = end_y - start_y + 1
+			self.range_y = range_y
+			self.x_axis = x_axis
+			self.y_axis = y_axis
+			self.clear()
+		
+		def _get_range(self):
+			if self.range_y is not None:
+				return tuple(self.range_y)
+			low, high = self.min_queue[0][1], self.max_queue[0][1]
+			if low == high:
+				return (low - 1, high + 1)
+			return (low, high)
+		
+		def _get_y(self, value):
+			low, high = self.current_range
+			y_axis_step = (self.end_y - self.start_y) / float(high - low)
+			origin_y = self.end_y - int(round(-low * y_axis_step))
+			return int(round(origin_y - y_axis_step * value))
+		
+		def _get_column(self, column):
+			# Builds the mask of one plot column, bit n is row start_y + n
+			if self.y_axis and column == 0:
+				return (1 << self.height) - 1
+			mask = 0
+			low, high = self.current_range
+			if self.x_axis:
+				if low <= 0 <= high:
+					x_axis_y = self._get_y(0)
+				elif low > 0:
+					x_axis_y = self.end_y
+				else:
+					x_axis_y = self.start_y
+				mask |= 1 << (x_axis_y - self.start_y)
+			
+			visible = min(self.count, self.width)
+			if column >= visible:
+				return mask
+			index = self.count - visible + column
+			y = self._get_y(self.values[index % self.width])
+			if column > 0:
+				prev_y = self._get_y(self.values[(index - 1) % self.width])
+			else:
+				prev_y = y
+			
+			# Same pixels as a line from the previous point to this one
+			if y > prev_y:
+				top, bottom = prev_y + 1, y
+			elif y < prev_y:
+				top, bottom = y, prev_y - 1
+			else:
+				top, bottom = y, y
+			top = max(top, self.start_y) - self.start_y
+			bottom = min(bottom, self.end_y) - self.start_y
+			if bottom >= top:
+				mask |= ((1 << (bottom - top + 1)) - 1) << top
+			return mask
+		
+		def clear(self):
+			self.values = [None] * self.width
+			self.count = 0
+			self.min_queue = deque()
+			self.max_queue = deque()
+			self.current_range = None
+		
+		def redraw(self):
+			if self.current_range is None:
+				return
+			for column in range(self.width):
+				self.draw.set_column_mask(self.start_x + column, self.start_y, self.height, self._get_column(column))
+			
+			if self.draw.auto_commit:
+				self.draw.display.commit()
+		
+		def append(self, value):
+			index = self.count
+			self.values[index % self.width] = value
+			self.count += 1
+			
+			# Monotonic queues of (index, value) keep the window minimum and maximum at their heads
+			while self.min_queue and self.min_queue[-1][1] >= value:
+				self.min_queue.pop()
+			self.min_queue.append((index, value))
+			while self.max_queue and self.max_queue[-1][1] <= value:
+				self.max_queue.pop()
+			self.max_queue.append((index, value))
+			oldest = self.count - self.width
+			while self.min_queue[0][0] < oldest:
+				self.min_queue.popleft()
+			while self.max_queue[0][0] < oldest:
+				self.max_queue.popleft()
+			
+			range_y = self._get_range()
+			if range_y != self.current_range:
+				self.current_range = range_y
+				return self.redraw()
+			
+			if self.count > self.width:
+				# Scroll the plot region left by one column
+				for x in range(self.start_x, self.end_x):
+					self.draw.set_column_mask(x, self.start_y, self.height, self.draw.get_column_mask(x + 1, self.start_y, self.height))
+				# Column 0 is either the y axis or still joined to the sample that scrolled out
+				self.draw.set_column_mask(self.start_x, self.start_y, self.height, self._get_column(0))
+				column = self.width - 1
+			else:
+				column = self.count - 1
+			self.draw.set_column_mask(self.start_x + column, self.start_y, self.height, self._get_column(column))
+			
+			if self.draw.auto_commit:
+				self.draw.display.commit()
+		
+		def extend(self, values):
+			for value in values:
+				self.append(value)
+	
+	class Console:
+		def __init__(self, draw, font, line_spacing = 1, scrollback = 200, hardware_scroll = True, min_interval = 0.0):
+			self.draw = draw
+			self.display = draw.display
+			try:
+				with open(font, 'r') as f:
+					font_data = json.loads(f.read())
+			except (IOError, ValueError):
+				raise RuntimeError("Failed to load font.")
+			
+			# Glyph cache, every glyph is a tuple of column masks including the spacing columns
+			self.glyph_height = max([len(char) for char in font_data['characters'].values()])
+			self.char_width = max([len(line) for char in font_data['characters'].values() for line in char])
+			self.cell_width = self.char_width + font_data['spacing']
+			self.line_height = self.glyph_height + line_spacing
+			self.glyphs = {}
+			for char, lines in font_data['characters'].items():
+				columns = [0] * self.cell_width
+				for y, line in enumerate(lines):
+					for x, value in enumerate(line):
+						if value:
+							columns[x] |= 1 << y
+				self.glyphs[char] = tuple(columns)
+			self.dummy_glyph = self.glyphs.get('dummy', (0, ) * self.cell_width)
+			
+			self.columns = self.display.columns // self.cell_width
+			self.rows = self.display.rows // self.line_height
+			# The start line can only be used if the text rows tile the whole screen
+			self.hardware_scroll = hardware_scroll and self.rows * self.line_height == self.display.rows
+			self.min_interval = min_interval
+			self.lines = deque(maxlen = scrollback)
+			self.line_count = 0
+			self.partial = u""
+			self.offset = 0
+			self.cells = None
+			self.shown_first_line = 0
+			self.last_flush = 0
+		
+		def _append_line(self, line):
+			line = line.replace(u"\r", u"").replace(u"\t", u" ")
+			chunks = [line[i:i + self.columns] for i in range(0, len(line), self.columns)] or [u""]
+			for chunk in chunks:
+				self.lines.append(chunk)
+				self.line_count += 1
+		
+		def _draw_cell(self, column, row, char):
+			glyph = self.glyphs.get(char, self.dummy_glyph)
+			x = column * self.cell_width
+			y = row * self.line_height
+			for i, mask in enumerate(glyph):
+				self.draw.set_column_mask(x + i, y, self.line_height, mask)
+		
+		def write(self, data):
+			if type(data) != unicode:
+				data = data.decode('utf-8', 'replace')
+			parts = (self.partial + data).split(u"\n")
+			for part in parts[:-1]:
+				self._append_line(part)
+			self.partial = parts[-1]
+			while len(self.partial) > self.columns:
+				self._append_line(self.partial[:self.columns])
+				self.partial = self.partial[self.columns:]
+		
+		def writelines(self, lines):
+			for line in lines:
+				self.write(line)
+		
+		def render(self):
+			lines = list(self.lines)
+			count = self.line_count
+			if self.partial:
+				lines.append(self.partial)
+				count += 1
+			visible_end = len(lines) - self.offset
+			visible = lines[max(0, visible_end - self.rows):visible_end]
+			first_line = count - self.offset - len(visible)
+			visible += [u""] * (self.rows - len(visible))
+			
+			if self.cells is None:
+				self.cells = [[None] * self.columns for row in range(self.rows)]
+			else:
+				shift = first_line - self.shown_first_line
+				if self.hardware_scroll and 0 < shift < self.rows:
+					# Let the controller move the rows that are still visible
+					self.display.scroll(shift * self.line_height)
+					self.cells = self.cells[shift:] + [[u" "] * self.columns for row in range(shift)]
+			self.shown_first_line = first_line
+			
+			# Only draw the cells whose character changed
+			for row, line in enumerate(visible):
+				line = line.ljust(self.columns)
+				cells = self.cells[row]
+				for column, char in enumerate(line):
+					if cells[column] != char:
+						self._draw_cell(column, row, char)
+						cells[column] = char
+		
+		def flush(self, force = False):
+			now = time.time()
+			if not force and now - self.last_flush < self.min_interval:
+				return
+			self.last_flush = now
+			self.render()
+			self.display.commit()
+		
+		def scroll_back(self, lines = 1):
+			self.offset = max(0, min(self.offset + lines, len(self.lines) + int(bool(self.partial)) - self.rows))
+			self.flush(force = True)
+		
+		def clear(self):
+			self.lines.clear()
+			self.line_count = 0
+			self.partial = u""
+			self.offset = 0
+			self.flush(force = True)
+	
 	def __init__(self, display, auto_commit = False):
 		self.display = display
 		self.auto_commit = auto_commit
@@ -202,6 +559,32 @@ class DisplayDraw:
 	def PATTERN_EMPTY(self, x, y):
 		return False
 	
+	def _get_position(self, x, y, width, height):
+		# Resolves alignment keywords and (position, min, max) tuples like image() and text() do
+		x_min, x_max, y_min, y_max = 0, self.display.columns - 1, 0, self.display.rows - 1
+		
+		if type(x) in (list, tuple):
+			x, x_min, x_max = x
+		
+		if type(y) in (list, tuple):
+			y, y_min, y_max = y
+		
+		if x == 'left':
+			x = x_min
+		elif x == 'center':
+			x = x_min + int(round((x_max - x_min - width + 1) / 2.0))
+		elif x == 'right':
+			x = x_max - width + 1
+		
+		if y == 'top':
+			y = y_min
+		elif y == 'middle':
+			y = y_min + int(round((y_max - y_min - height + 1) / 2.0))
+		elif y == 'bottom':
+			y = y_max - height + 1
+		
+		return x, y
+	
 	def _polar_to_rect(self, x, y, angle, length):
 		w = int(round(math.sin(math.radians(angle)) * length))
 		h = int(round(math.cos(math.radians(angle)) * length))
@@ -214,7 +597,7 @@ class DisplayDraw:
 			return
 		if y >= self.display.rows or y < 0:
 			return
-		page, pos = divmod(y, 8)
+		page, pos = divmod((y + self.display.start_line) % self.display.rows, 8)
 		return bool(self.display.content[x][page][pos])
 	
 	def pixel(self, x, y, clear = False):
@@ -222,9 +605,63 @@ class DisplayDraw:
 			return
 		if y >= self.display.rows or y < 0:
 			return
-		page, pos = divmod(y, 8)
+		page, pos = divmod((y + self.display.start_line) % self.display.rows, 8)
 		self.display.content[x][page][pos] = int(not clear)
 	
+	def _column_sections(self, x, y, height):
+		# Clips a column section to the screen and splits it where it wraps around the framebuffer
+		# Returns a list of (framebuffer row, height, mask bit offset)
+		if x >= self.display.columns or x < 0:
+			return []
+		if y < 0:
+			height += y
+			offset = -y
+			y = 0
+		else:
+			offset = 0
+		height = min(height, self.display.rows - y)
+		if height <= 0:
+			return []
+		y = (y + self.display.start_line) % self.display.rows
+		first_height = min(height, self.display.rows - y)
+		sections = [(y, first_height, offset)]
+		if first_height < height:
+			sections.append((0, height - first_height, offset + first_height))
+		return sections
+	
+	def get_column_mask(self, x, y, height):
+		# Returns the pixels of a column section as a mask, bit n is row y + n
+		mask = 0
+		for _y, _height, offset in self._column_sections(x, y, height):
+			column = self.display.content[x]
+			value = 0
+			for page in range(_y // 8, (_y + _height - 1) // 8 + 1):
+				value |= bool_list_to_mask(column[page]) << (page * 8)
+			mask |= ((value >> _y) & ((1 << _height) - 1)) << offset
+		return mask
+	
+	def _write_column_mask(self, x, y, height, mask, window):
+		for _y, _height, offset in self._column_sections(x, y, height):
+			column = self.display.content[x]
+			_window = ((window >> offset) & ((1 << _height) - 1)) << _y
+			_mask = ((mask >> offset) << _y) & _window
+			for page in range(_y // 8, (_y + _height - 1) // 8 + 1):
+				page_window = (_window >> (page * 8)) & 0xFF
+				if not page_window:
+					continue
+				value = bool_list_to_mask(column[page])
+				new_value = (value & ~page_window) | ((_mask >> (page * 8)) & page_window)
+				if new_value != value:
+					column[page] = list(PAGE_BITS[new_value])
+	
+	def set_column_mask(self, x, y, height, mask):
+		# Replaces a column section with the pixels of a mask, bit n is row y + n
+		self._write_column_mask(x, y, height, mask, (1 << height) - 1)
+	
+	def column_mask(self, x, y, mask, clear = False):
+		# Draws the set bits of a mask into a column, bit n is row y + n
+		self._write_column_mask(x, y, mask.bit_length(), 0 if clear else mask, mask)
+	
 	def line(self, start_x, start_y, stop_x, stop_y, clear = False):
 		if start_x == stop_x:
 			y_range = range(start_y, stop_y + 1) if stop_y >= start_y else range(stop_y, start_y + 1)
@@ -314,8 +751,7 @@ class DisplayDraw:
 			self.display.commit()
 	
 	def image(self, img, x, y, width = None, height = None, angle = 0, threshold = 127, clear = False):
-		if not IMAGE:
-			raise RuntimeError("PIL is required to display images, but it is not installed on your system.")
+		Image, ImageDraw, ImageFont = _import_pil("display images")
 		if isinstance(img, Image.Image):
 			im = img
 		else:
@@ -370,8 +806,7 @@ class DisplayDraw:
 	def text(self, text, x, y, size = 10, font = "/usr/share/fonts/truetype/freefont/FreeSans.ttf", angle = 0, clear = False):
 		truetype = font.lower().endswith(".ttf")
 		if truetype:
-			if not IMAGE:
-				raise RuntimeError("PIL is required to display text using TrueType fonts, but it is not installed on your system.")
+			Image, ImageDraw, ImageFont = _import_pil("display text using TrueType fonts")
 			font = ImageFont.truetype(font, size)
 			size = font.getsize(text)
 		else:
@@ -510,37 +945,84 @@ class DisplayDraw:
 		if self.auto_commit:
 			self.display.commit()
 	
-	def function_plot(self, func, left_x, right_x, base_y, y_scale, min_x, max_x, clear = False):
+	def function_plot(self, func, left_x, right_x, base_y, y_scale, min_x, max_x, cache = False, clear = False):
+		# Samples are only cached on request, cache = True keys them on the function object which
+		# is only safe for pure functions, any other hashable value is used as the key instead
+		count = right_x - left_x + 1
 		x_step = float(max_x - min_x) / float(right_x - left_x)
-		for i in range(right_x - left_x + 1):
-			prev_x_val = min_x + x_step * (i - 1)
-			x_val = min_x + x_step * i
-			self.line(left_x + i, base_y - int(round(func(prev_x_val) * y_scale)), left_x + i, base_y - int(round(func(x_val) * y_scale)), clear = clear)
+		key = (func if cache is True else cache, min_x, max_x, count)
+		values = FUNCTION_PLOT_CACHE.get(key) if cache else None
+		if values is None:
+			values = _sample_function(func, min_x, x_step, count)
+			if cache:
+				FUNCTION_PLOT_CACHE.put(key, values)
+		
+		# Connect every sample to the previous one with a vertical span
+		ys = [base_y - int(round(value * y_scale)) for value in values]
+		for i in range(count):
+			top, bottom = sorted((ys[i], ys[i + 1]))
+			self.column_mask(left_x + i, top, (1 << (bottom - top + 1)) - 1, clear = clear)
 		
 		if self.auto_commit:
 			self.display.commit()
 	
-	def qrcode(self, text, x, y, max_size, clear = False):
-		return
-		if not IMAGE:
-			raise RuntimeError("PIL is required to display QR codes, but it is not installed on your system.")
+	def qrcode(self, text, x, y, max_size, error_correct_level = None, version = 0, border = 0, invert = False, cache = True, clear = False):
+		from . import PyQRNative as qr
+		if error_correct_level is None:
+			error_correct_level = qr.QRErrorCorrectLevel.L
+		if type(text) == unicode:
+			text = text.encode('utf-8')
 		
-		code = qr.QRCode(1, qr.QRErrorCorrectLevel.L)
-		code.addData(text)
-		code.make()
-		image = code.makeImage()
-		width, height = image.size
+		# The module columns only depend on the payload, the blit also on the scale
+		key = (text, error_correct_level, version)
+		matrix = QR_MATRIX_CACHE.get(key) if cache else None
+		if matrix is None:
+			code = qr.QRCode(version, error_correct_level)
+			code.addData(text)
+			code.make()
+			module_count = code.getModuleCount()
+			columns = [0] * module_count
+			for row, bits in enumerate(code.getModuleRows()):
+				for col in range(module_count):
+					if (bits >> col) & 1:
+						columns[col] |= 1 << row
+			matrix = (module_count, columns)
+			if cache:
+				QR_MATRIX_CACHE.put(key, matrix)
+		module_count, columns = matrix
 		
-		if width > max_size or height > max_size:
-			for i in range(max_size):
-				size = max_size - i
-				if divmod(width, size)[1] == 0:
-					image = image.resize((size, size))
-					break
+		# Largest integer module size that fits, including the quiet zone
+		count = module_count + 2 * border
+		scale = max_size // count
+		if scale < 1:
+			raise RuntimeError("The QR code needs %i pixels, but only %i are available." % (count, max_size))
+		size = count * scale
+		x, y = self._get_position(x, y, size, size)
 		
-		image.save("qr.png")
+		blit_key = key + (scale, border, invert)
+		masks = QR_BLIT_CACHE.get(blit_key) if cache else None
+		if masks is None:
+			masks = []
+			module_mask = (1 << scale) - 1
+			for col in range(count):
+				c = col - border
+				bits = columns[c] if 0 <= c < module_count else 0
+				mask = 0
+				for row in range(count):
+					r = row - border
+					dark = 0 <= r < module_count and (bits >> r) & 1 == 1
+					if dark != invert:
+						mask |= module_mask << (row * scale)
+				masks.append(mask)
+			if cache:
+				QR_BLIT_CACHE.put(blit_key, masks)
 		
-		self.image(image, x, y, condition = 'red > 100 or green > 100 or blue > 100', clear = clear)
+		for col in range(count):
+			for i in range(scale):
+				if clear:
+					self.column_mask(x + col * scale + i, y, masks[col], clear = True)
+				else:
+					self.set_column_mask(x + col * scale + i, y, size, masks[col])
 		
 		if self.auto_commit:
 			self.display.commit()
@@ -561,25 +1043,32 @@ class DisplayDraw:
 		if self.auto_commit:
 			self.display.commit()
 	
-	def plot(self, start_x, start_y, end_x, end_y, points, range_x = None, range_y = None, x_axis = True, y_axis = True, connect = True, clear = False):
+	def console(self, font, line_spacing = 1, scrollback = 200, hardware_scroll = True, min_interval = 0.0):
+		return self.Console(self, font, line_spacing = line_spacing, scrollback = scrollback, hardware_scroll = hardware_scroll, min_interval = min_interval)
+	
+	def strip_chart(self, start_x, start_y, end_x, end_y, range_y = None, x_axis = True, y_axis = True):
+		return self.StripChart(self, start_x, start_y, end_x, end_y, range_y = range_y, x_axis = x_axis, y_axis = y_axis)
+	
+	def plot(self, start_x, start_y, end_x, end_y, points, range_x = None, range_y = None, x_axis = True, y_axis = True, connect = True, downsample = 'minmax', clear = False):
 		data_start_x = start_x
 		data_start_y = end_y
 		data_end_x = end_x
 		data_end_y = start_y
 		origin = [data_start_x, data_start_y]
 		
-		if type(points[0]) in (int, float):
-			points = [(x, value) for x, value in enumerate(points)]
+		points = _to_points(points)
+		points.sort(key = lambda point: point[0])
 		
 		# Determine the axis ranges
 		if range_x is None:
-			range_x = [min([point[0] for point in points]), max([point[0] for point in points])]
+			range_x = [points[0][0], points[-1][0]]
 			if range_x[0] == range_x[1]:
 				range_x[0] -= 1
 				range_x[1] += 1
 				
 		if range_y is None:
-			range_y = [min([point[1] for point in points]), max([point[1] for point in points])]
+			values = [point[1] for point in points]
+			range_y = [min(values), max(values)]
 			if range_y[0] == range_y[1]:
 				range_y[0] -= 1
 				range_y[1] += 1
@@ -626,9 +1115,16 @@ class DisplayDraw:
 			#self.pixel(end_x - 1, x_axis_y - 1)
 			#self.pixel(end_x - 1, x_axis_y + 1)
 		
-		# Draw the points
-		points.sort(key = lambda point: point[0])
+		# Reduce the points to what can actually be seen. Scatter plots need every point, so minmax only applies to lines
+		if downsample == 'minmax':
+			if connect:
+				points = downsample_minmax(points, lambda x: int(round(origin[0] + x_axis_step * x)))
+		elif downsample == 'lttb':
+			points = downsample_lttb(points, end_x - start_x + 1)
+		elif downsample is not None:
+			raise ValueError("Unknown downsampling mode: %s" % downsample)
 		
+		# Draw the points
 		for index, point in enumerate(points):
 			x, y = point
 			x = int(round(origin[0] + x_axis_step * x))
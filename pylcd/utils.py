@@ -1,11 +1,74 @@
 # Copyright (C) 2013 Julian Metzler
 # See the LICENSE file for the full license.
 
+import threading
+
+from collections import OrderedDict
+
+class LRUCache:
+	def __init__(self, size = 32):
+		self.size = size
+		self.items = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+		self.lock = threading.Lock()
+	
+	def __len__(self):
+		return len(self.items)
+	
+	def __contains__(self, key):
+		return key in self.items
+	
+	def get(self, key, default = None):
+		with self.lock:
+			try:
+				value = self.items.pop(key)
+			except KeyError:
+				self.misses += 1
+				return default
+			self.items[key] = value
+			self.hits += 1
+			return value
+	
+	def put(self, key, value):
+		with self.lock:
+			self.items.pop(key, None)
+			self.items[key] = value
+			if len(self.items) > self.size:
+				self.items.popitem(last = False)
+	
+	def clear(self):
+		with self.lock:
+			self.items.clear()
+			self.hits = 0
+			self.misses = 0
+	
+	def stats(self):
+		with self.lock:
+			return {'hits': self.hits, 'misses': self.misses, 'size': len(self.items), 'max_size': self.size}
+
+# The bits of every byte value, most significant bit first
+BYTE_BITS = tuple([tuple([bool((value >> (7 - i)) & 1) for i in range(8)]) for value in range(256)])
+
+# The high and low nibble of every byte value as bit tuples
+BYTE_NIBBLES = tuple([(bits[:4], bits[4:]) for bits in BYTE_BITS])
+
+# Byte value and page mask (bit n set for item n) of every 8-item bit sequence,
+# tuples of bools and of ints hash the same so both can be looked up
+BITS_VALUES = dict([(bits, value) for value, bits in enumerate(BYTE_BITS)])
+BITS_MASKS = dict([(bits[::-1], value) for value, bits in enumerate(BYTE_BITS)])
+
+# Every byte value with its bit order reversed
+REVERSED_BYTES = tuple([BITS_MASKS[bits] for bits in BYTE_BITS])
+
 def bool_list_to_mask(list):
+	mask = BITS_MASKS.get(tuple(list)) if len(list) == 8 else None
+	if mask is not None:
+		return mask
 	mask = 0
 	for i in range(len(list)):
 		if bool(int(list[i])):
-			mask += 2 ** i
+			mask |= 1 << i
 	return mask
 
 def nibble_to_mask(backend, nibble, data):
@@ -20,18 +83,15 @@ def nibble_to_mask(backend, nibble, data):
 	return mask
 
 def value_to_byte(value):
-	assert value >= 0
-	assert value <= 255
-	b = bin(value)[2:10]
-	b = "0" * (8 - len(b)) + b
-	bits = tuple([bit == "1" for bit in list(b)])
-	return bits
+	assert 0 <= value <= 255
+	return BYTE_BITS[value]
 
 def value_to_nibbles(value):
-	byte = value_to_byte(value)
-	return (byte[:4], byte[4:])
+	assert 0 <= value <= 255
+	return BYTE_NIBBLES[value]
 
 def byte_to_value(byte):
-	b = "".join([str(int(item)) for item in byte])
-	value = int(b, 2)
-	return value
\ No newline at end of file
+	value = BITS_VALUES.get(tuple(byte))
+	if value is None:
+		value = int("".join([str(int(item)) for item in byte]), 2)
+	return value
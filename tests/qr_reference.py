@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2013-2016 Julian Metzler
+# See the LICENSE file for the full license.
+
+"""
+Script to generate the golden QR codes used by test_pyqrnative.py with an
+independent reference encoder, segno (https://pypi.org/project/segno/).
+It runs on Python 3 and doesn't use pylcd at all.
+"""
+
+import json
+import os
+
+import segno
+from segno import consts
+
+GOLDEN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "qr_golden.json")
+
+# Single segment codes filled to the capacity of the given version
+FILLED = [
+	('numeric-1-L', "0123456789", 'numeric', 1, 'L'),
+	('alphanumeric-2-M', "HTTPS://EXAMPLE.COM/DEVICE/0042 ", 'alphanumeric', 2, 'M'),
+	('byte-7-Q', "WIFI:T:WPA;S:pylcd-net;P:correct horse 42;;", 'byte', 7, 'Q'),
+	('byte-10-H', "WIFI:T:WPA;S:pylcd-net;P:correct horse 42;;", 'byte', 10, 'H'),
+	('numeric-14-M', "0123456789", 'numeric', 14, 'M'),
+]
+
+# Codes with the segments an optimal segmentation has to find, a version of None is chosen by the encoder.
+# segno adds a spurious zero codeword when the terminator ends on a codeword boundary, the data here doesn't
+SEGMENTED = [
+	('mixed-3-M', [("ABCDEFGHIJK", 'alphanumeric'), ("0123456789" * 4, 'numeric'), ("café", 'byte')], 3, 'M'),
+	('mixed-auto-H', [("ABCDEFGHIJK", 'alphanumeric'), ("0123456789" * 4, 'numeric'), ("café", 'byte')], None, 'H'),
+	('numeric-auto-L', [(("0123456789" * 13)[:128], 'numeric')], None, 'L'),
+]
+
+def make(segments, version, level, mask = None):
+	# Byte segments are sent as UTF-8 like pylcd does
+	segments = [(text.encode('utf-8') if mode == 'byte' else text, consts.MODE_MAPPING[mode]) for text, mode in segments]
+	return segno.make_qr(segments, version = version, error = level, mask = mask, boost_error = False)
+
+def fill_payload(text, mode, version, level):
+	# The longest repetition of the text that still fits as a single segment of the given mode
+	low, high = 0, 7090
+	while low < high:
+		length = (low + high + 1) // 2
+		try:
+			make([((text * (length // len(text) + 1))[:length], mode)], version, level, mask = 0)
+		except segno.DataOverflowError:
+			high = length - 1
+		else:
+			low = length
+	return (text * (low // len(text) + 1))[:low]
+
+def module_rows(code):
+	# One hex number per row, bit n is the module in column n
+	return ["%x" % sum([1 << column for column, dark in enumerate(row) if dark]) for row in code.matrix]
+
+def main():
+	golden = {'_source': "segno %s, generated by qr_reference.py" % segno.__version__}
+	cases = [(name, [(fill_payload(text, mode, version, level), mode)], mode, version, level) for name, text, mode, version, level in FILLED]
+	cases += [(name, segments, None, version, level) for name, segments, version, level in SEGMENTED]
+	for name, segments, mode, version, level in cases:
+		code = make(segments, version, level)
+		golden[name] = {
+			'payload': "".join([text for text, _mode in segments]),
+			'mode': mode,
+			'segments': segments,
+			'version': version,
+			'level': level,
+			'symbol_version': code.version,
+			'mask': code.mask,
+			'rows': module_rows(code),
+		}
+
+	with open(GOLDEN_FILE, 'w') as f:
+		json.dump(golden, f, indent = 1, sort_keys = True, separators = (',', ': '))
+	print("Wrote %i golden codes to %s" % (len(golden) - 1, GOLDEN_FILE))
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,177 @@
+# Copyright (C) 2013-2016 Julian Metzler
+# See the LICENSE file for the full license.
+
+import threading
+import time
+import unittest
+
+import pylcd
+from pylcd import hd44780
+
+class MarqueeTest(unittest.TestCase):
+	def make_display(self):
+		display = hd44780.Display(backend = pylcd.DummyBackend, pinmap = {}, lines = 2, columns = 16)
+		display.clear()
+		return display
+	
+	def get_visible_line(self, display, line):
+		# The characters on the glass, taking the display shift into account
+		index, address = display.geometry[line]
+		controller = display.controllers[index]
+		row = address & 0x40
+		return "".join([chr(controller.ddram[row + (address - row + controller.shift + column) % 0x28]) for column in range(display.column_count)])
+	
+	def test_write_after_stop(self):
+		for text in ("Short ticker", "A ticker text that is longer than the forty cells of a DDRAM row"):
+			display = self.make_display()
+			display.marquee(text, line = 1, delay = 0, count = 7)
+			self.assertEqual(display.controllers[0].shift, 0)
+			display.update(["Line one", "Line two"])
+			self.assertEqual(self.get_visible_line(display, 0), "Line one".ljust(16))
+			self.assertEqual(self.get_visible_line(display, 1), "Line two".ljust(16))
+			display.set_cursor_position(0, 0)
+			display.write_string("Written")
+			self.assertEqual(self.get_visible_line(display, 0), "Writtene".ljust(16))
+	
+	def test_stop_after_manual_steps(self):
+		display = self.make_display()
+		marquee = hd44780.Marquee(display, "Scrolling", line = 0)
+		for i in range(5):
+			marquee.step()
+		self.assertEqual(self.get_visible_line(display, 0), "ling".ljust(16))
+		marquee.stop()
+		display.update(["Static", ""])
+		self.assertEqual(self.get_visible_line(display, 0), "Static".ljust(16))
+
+class UpdateTest(unittest.TestCase):
+	def test_long_lines_are_clipped_to_their_row(self):
+		display = hd44780.Display(backend = pylcd.DummyBackend, pinmap = {}, lines = 2, columns = 16)
+		display.clear()
+		display.update(["x" * 70, "y" * 70])
+		ddram = display.controllers[0].ddram
+		self.assertEqual(ddram[0x00:0x28], [ord("x")] * 0x28)
+		self.assertEqual(ddram[0x40:0x68], [ord("y")] * 0x28)
+		display.update_cells(30, 0, "z" * 20)
+		self.assertEqual(ddram[0x1E:0x28], [ord("z")] * 10)
+		self.assertEqual(ddram[0x40], ord("y"))
+	
+	def test_lines_sharing_a_row_stay_separate(self):
+		display = hd44780.Display(backend = pylcd.DummyBackend, pinmap = {}, lines = 4, columns = 20)
+		display.clear()
+		display.update(["a" * 30, "b" * 30, "c" * 30, "d" * 30])
+		ddram = display.controllers[0].ddram
+		self.assertEqual(ddram[0x00:0x28], [ord("a")] * 20 + [ord("c")] * 20)
+		self.assertEqual(ddram[0x40:0x68], [ord("b")] * 20 + [ord("d")] * 20)
+
+class GeometryTest(unittest.TestCase):
+	def test_max_chars_per_line(self):
+		for columns, lines, expected in ((16, 2, 40), (20, 4, 20), (16, 4, 16), (40, 4, 40)):
+			display = hd44780.Display(backend = pylcd.DummyBackend, pinmap = {}, lines = lines, columns = columns)
+			self.assertEqual(display.max_chars_per_line, expected, "%ix%i" % (columns, lines))
+
+class FullBlockTest(unittest.TestCase):
+	def make_display(self, rom):
+		display = hd44780.Display(backend = pylcd.DummyBackend, pinmap = {}, lines = 2, columns = 16, rom = rom)
+		display.clear()
+		return display
+	
+	def test_rom_full_block(self):
+		display = self.make_display('A00')
+		display.bar_graph(1.0)
+		self.assertEqual(display.controllers[0].ddram[0x00:0x10], [0xFF] * 16)
+		self.assertNotIn('full', display.glyph_slots)
+	
+	def test_cgram_full_block(self):
+		display = self.make_display('A02')
+		display.big_number("8")
+		slot = display.glyph_slots['full']
+		self.assertEqual(display.cgram[slot], (0b11111, ) * 8)
+		self.assertEqual(display.controllers[0].ddram[0x00], slot)
+		self.assertEqual(display.controllers[0].ddram[0x40], slot)
+		display.bar_graph(1.0, line = 1)
+		self.assertEqual(display.controllers[0].ddram[0x40:0x50], [slot] * 16)
+
+class StatusInput(pylcd.NoInput):
+	# NoInput without the status outputs DisplayUI sets
+	def set_ready(self, state):
+		pass
+	
+	def set_error(self, state):
+		pass
+
+class RefreshSchedulerTest(unittest.TestCase):
+	def make_display(self):
+		display = hd44780.Display(backend = pylcd.DummyBackend, pinmap = {}, lines = 2, columns = 16)
+		display.clear()
+		# Records every screen written and how many writes overlapped
+		display.written = []
+		display.active = 0
+		display.max_active = 0
+		update = display.update
+		def recording_update(lines):
+			display.active += 1
+			display.max_active = max(display.max_active, display.active)
+			time.sleep(0.001)
+			update(lines)
+			display.written.append(tuple(lines))
+			display.active -= 1
+		display.update = recording_update
+		return display
+	
+	def wait_until(self, condition, timeout = 2.0):
+		end = time.time() + timeout
+		while not condition() and time.time() < end:
+			time.sleep(0.005)
+		self.assertTrue(condition())
+	
+	def test_flush_from_another_thread(self):
+		display = self.make_display()
+		scheduler = hd44780.RefreshScheduler(display, fps = 1000.0)
+		def produce():
+			for i in range(100):
+				scheduler.post(["Worker %i" % i])
+		producer = threading.Thread(target = produce)
+		producer.start()
+		for i in range(100):
+			scheduler.post(["Caller %i" % i])
+			scheduler.flush()
+		producer.join()
+		scheduler.stop()
+		self.assertEqual(display.max_active, 1)
+	
+	def test_hold(self):
+		display = self.make_display()
+		scheduler = hd44780.RefreshScheduler(display)
+		scheduler.post(["Held"], hold = 0.2)
+		self.wait_until(lambda: display.written)
+		scheduler.post(["Next"])
+		time.sleep(0.1)
+		self.assertEqual(display.written, [("Held", )])
+		self.wait_until(lambda: len(display.written) == 2)
+		self.assertEqual(display.written[1], ("Next", ))
+		scheduler.stop()
+	
+	def test_cycle_strings(self):
+		display = self.make_display()
+		scheduler = hd44780.RefreshScheduler(display)
+		start = time.time()
+		display.cycle_strings(["One", "Two"], delay = 0.05, count = 2, scheduler = scheduler)
+		self.assertLess(time.time() - start, 0.05)
+		self.wait_until(lambda: len(display.written) == 4)
+		self.assertEqual(display.written, [("One", ), ("Two", ), ("One", ), ("Two", )])
+		scheduler.stop()
+	
+	def test_message_duration(self):
+		display = self.make_display()
+		scheduler = hd44780.RefreshScheduler(display)
+		ui = hd44780.DisplayUI(display, StatusInput, scheduler = scheduler)
+		start = time.time()
+		ui.message("Saved", duration = 0.2)
+		ui.message("Ready")
+		self.assertLess(time.time() - start, 0.1)
+		self.wait_until(lambda: len(display.written) == 2, timeout = 1.0)
+		self.assertEqual([lines[0].strip() for lines in display.written], ["Saved", "Ready"])
+		scheduler.stop()
+
+if __name__ == "__main__":
+	unittest.main()
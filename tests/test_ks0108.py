@@ -0,0 +1,75 @@
+# Copyright (C) 2013-2016 Julian Metzler
+# See the LICENSE file for the full license.
+
+import itertools
+import random
+import unittest
+
+import pylcd
+from pylcd import ks0108
+
+class StripChartTest(unittest.TestCase):
+	def make_draw(self):
+		display = ks0108.Display(backend = pylcd.DummyBackend, pinmap = {})
+		return ks0108.DisplayDraw(display)
+	
+	def assert_scrolled_frames_match_plot(self, y_axis):
+		chart_draw = self.make_draw()
+		plot_draw = self.make_draw()
+		chart = chart_draw.strip_chart(10, 10, 60, 40, y_axis = y_axis)
+		window = []
+		for i in range(200):
+			value = 0 if i % 2 else 10
+			window = (window + [value])[-chart.width:]
+			chart.append(value)
+			if i < chart.width:
+				continue
+			plot_draw.display.clear()
+			plot_draw.plot(10, 10, 60, 40, list(enumerate(window)), range_x = (0, chart.width - 1), y_axis = y_axis)
+			for x in range(10, 61):
+				for y in range(10, 41):
+					self.assertEqual(chart_draw.get_pixel(x, y), plot_draw.get_pixel(x, y), "Sample %i differs at (%i, %i)" % (i, x, y))
+	
+	def test_scrolled_frames_match_plot(self):
+		self.assert_scrolled_frames_match_plot(y_axis = True)
+	
+	def test_scrolled_frames_match_plot_without_y_axis(self):
+		self.assert_scrolled_frames_match_plot(y_axis = False)
+
+class PlotTest(unittest.TestCase):
+	def make_draw(self):
+		display = ks0108.Display(backend = pylcd.DummyBackend, pinmap = {})
+		return ks0108.DisplayDraw(display)
+	
+	def assert_downsampled_plot_matches(self, points, **kwargs):
+		full_draw = self.make_draw()
+		sampled_draw = self.make_draw()
+		full_draw.plot(0, 0, 127, 63, points, downsample = None, **kwargs)
+		sampled_draw.plot(0, 0, 127, 63, points, **kwargs)
+		for x in range(128):
+			for y in range(64):
+				self.assertEqual(sampled_draw.get_pixel(x, y), full_draw.get_pixel(x, y), "Pixel (%i, %i) differs" % (x, y))
+	
+	def random_points(self, count):
+		generator = random.Random(42)
+		return [(x, generator.uniform(-100, 100)) for x in range(count)]
+	
+	def test_minmax_matches_full_resolution(self):
+		self.assert_downsampled_plot_matches(self.random_points(1000))
+	
+	def test_minmax_matches_full_resolution_with_range(self):
+		self.assert_downsampled_plot_matches(self.random_points(1000), range_x = (-50, 1200))
+	
+	def test_scatter_plot_keeps_every_point(self):
+		self.assert_downsampled_plot_matches(self.random_points(1000), connect = False)
+
+class FunctionSampleTest(unittest.TestCase):
+	def test_function_ignoring_its_argument(self):
+		counter = itertools.count()
+		self.assertEqual(ks0108._sample_function(lambda x: float(next(counter)), 0.0, 0.5, 10), [float(i) for i in range(11)])
+	
+	def test_function_of_x(self):
+		self.assertEqual(ks0108._sample_function(lambda x: x * 2, 0.0, 0.5, 4), [-1.0, 0.0, 1.0, 2.0, 3.0])
+
+if __name__ == "__main__":
+	unittest.main()
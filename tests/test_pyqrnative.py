@@ -0,0 +1,55 @@
+# Copyright (C) 2013-2016 Julian Metzler
+# See the LICENSE file for the full license.
+
+import json
+import os
+import unittest
+
+from pylcd.PyQRNative import *
+
+# Codes from an independent encoder, see qr_reference.py
+GOLDEN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "qr_golden.json")
+
+MODES = {
+	'numeric': QRMode.MODE_NUMBER,
+	'alphanumeric': QRMode.MODE_ALPHA_NUM,
+	'byte': QRMode.MODE_8BIT_BYTE,
+	None: None,
+}
+
+class SegmentationTest(unittest.TestCase):
+	def segment_modes(self, data):
+		return [(segment.mode, segment.data) for segment in QRUtil.getOptimalSegments(data, 1)]
+	
+	def test_unicode_digits_are_not_numeric(self):
+		self.assertEqual(self.segment_modes(u"\xb2\xb3"), [(QRMode.MODE_8BIT_BYTE, "\xc2\xb2\xc2\xb3")])
+		qr = QRCode(0, QRErrorCorrectLevel.M)
+		qr.addData(u"\xb2\xb3")
+		qr.make()
+	
+	def test_unicode_bytes_are_utf8(self):
+		self.assertEqual(QR8bitByte(u"\u20ac 5").data, "\xe2\x82\xac 5")
+		for mode in (None, QRMode.MODE_8BIT_BYTE):
+			qr = QRCode(0, QRErrorCorrectLevel.M)
+			qr.addData(u"\u20ac 5", mode)
+			qr.make()
+
+class ConformanceTest(unittest.TestCase):
+	def setUp(self):
+		with open(GOLDEN_FILE, 'r') as f:
+			self.golden = json.load(f)
+		del self.golden['_source']
+	
+	def test_golden_codes(self):
+		for name, expected in sorted(self.golden.items()):
+			code = QRCode(expected['version'] or 0, getattr(QRErrorCorrectLevel, expected['level']))
+			code.addData(expected['payload'], MODES[expected['mode']])
+			code.make()
+			self.assertEqual(code.typeNumber, expected['symbol_version'], name)
+			segments = [(segment.mode, segment.data) for segment in QRUtil.getSegmentList(code.dataList, code.typeNumber)]
+			self.assertEqual(segments, [(MODES[mode], text.encode('utf-8') if mode == 'byte' else text) for text, mode in expected['segments']], name)
+			self.assertEqual(["%x" % row for row in code.getModuleRows()], expected['rows'], name)
+			self.assertEqual(code.getBestMaskPattern(), expected['mask'], name)
+
+if __name__ == "__main__":
+	unittest.main()